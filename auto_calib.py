@@ -0,0 +1,343 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from camera_models import camera_from_config, get_rotation_matrix
+from feature_cache import edge_distance_map, FEATURE_SCALE, DIST_STEP
+from pcd_loader import read_pcd
+
+EXTRINSIC_KEYS = ('x', 'y', 'z', 'roll', 'pitch', 'yaw')
+# Correction [dx, dy, dz, wx, wy, wz]: translation (m) added to t and a small
+# camera-frame rotation vector (deg) applied on top of R. Unlike Euler-angle
+# deltas this stays well conditioned near pitch = +-90, where our cameras sit.
+# Optimizer step units: metres for translation, degrees for rotation
+PARAM_SCALE = np.array([0.05, 0.05, 0.05, 0.5, 0.5, 0.5])
+# Range jump (metres) to a farther neighbour that makes a point a depth edge
+MIN_RANGE_JUMP = 0.5
+# Between beams the jump must also be this fraction of the range: successive
+# beams hitting the ground get farther apart with range but are not edges
+MIN_RELATIVE_JUMP_VERTICAL = 0.35
+# Edge points kept per frame (random subsample)
+MAX_EDGE_POINTS = 20000
+# Coarse-to-fine stages: distance transform clip (full-resolution pixels),
+# evaluation budget, and search radius around the previous stage's result
+# (metres, degrees). Later stages search narrowly: with a tight clip the cost
+# has side minima where edges lock onto a neighbouring outline.
+STAGES = (
+    (40.0, 1000, (0.5, 5.0)),
+    (12.0, 600, (0.05, 0.5)),
+)
+# Clip (full-resolution pixels) of the alignment score shown while editing
+SCORE_CLIP = STAGES[-1][0]
+
+
+def load_scan(path):
+    """
+    LiDAR points in raw scan order (not LOD order) and the scan width.
+    Neighbouring points along a row are neighbouring beams in azimuth.
+    """
+    header, columns = read_pcd(path, ('x', 'y', 'z'))
+    points = np.stack([columns['x'], columns['y'], columns['z']], axis=-1).astype(np.float64)
+    width = header['width'] if header['height'] > 1 else len(points)
+    return points, width
+
+
+def _edge_pairs(r, a, b, relative):
+    # (near, far) index pairs of neighbours a[k], b[k] whose ranges jump
+    d = r[b] - r[a]
+    with np.errstate(invalid='ignore'):
+        fwd = (d >= MIN_RANGE_JUMP) & (d >= relative * r[a])
+        back = (-d >= MIN_RANGE_JUMP) & (-d >= relative * r[b])
+    return np.concatenate([a[fwd], b[back]]), np.concatenate([b[fwd], a[back]])
+
+
+def lidar_edge_points(points, width=None, max_points=MAX_EDGE_POINTS, seed=0):
+    """
+    Depth-discontinuity points: where a neighbour in scan order is at least
+    MIN_RANGE_JUMP metres farther away. For organized clouds (rows of `width`
+    points, one row per beam) the neighbours above and below count too, so
+    horizontal outlines are found as well.
+
+    The true outline lies between the last point on the object and its
+    farther neighbour, so each edge point is placed on the bisecting ray at
+    the foreground range rather than on the foreground point itself (which
+    would bias the pose by half a beam spacing).
+    """
+    n = len(points)
+    if n < 3:
+        return np.zeros((0, 3))
+    r = np.linalg.norm(points, axis=1)
+    r[~np.isfinite(r) | (r <= 0)] = np.nan
+
+    idx = np.arange(n)
+    a, b = idx[:-1], idx[1:]
+    if width and width < n:
+        # Neighbours across a row boundary are not adjacent in azimuth
+        keep = (a % width) != width - 1
+        near, far = _edge_pairs(r, a[keep], b[keep], 0.0)
+        v_near, v_far = _edge_pairs(r, idx[:-width], idx[width:], MIN_RELATIVE_JUMP_VERTICAL)
+        near = np.concatenate([near, v_near])
+        far = np.concatenate([far, v_far])
+    else:
+        near, far = _edge_pairs(r, a, b, 0.0)
+
+    if len(near) > max_points:
+        rng = np.random.default_rng(seed)
+        pick = rng.choice(len(near), max_points, replace=False)
+        near, far = near[pick], far[pick]
+    mid = points[near] / r[near, None] + points[far] / r[far, None]
+    mid /= np.linalg.norm(mid, axis=1, keepdims=True)
+    return mid * r[near, None]
+
+
+def scan_edge_points(path):
+    return lidar_edge_points(*load_scan(path))
+
+
+def sample_bilinear(img, u, v):
+    """
+    Bilinear sample of a 2D image at (u, v) as float; coordinates must be inside.
+    """
+    x0 = np.floor(u).astype(np.intp)
+    y0 = np.floor(v).astype(np.intp)
+    np.clip(x0, 0, img.shape[1] - 2, out=x0)
+    np.clip(y0, 0, img.shape[0] - 2, out=y0)
+    fx = u - x0
+    fy = v - y0
+    top = img[y0, x0] * (1 - fx) + img[y0, x0 + 1] * fx
+    bottom = img[y0 + 1, x0] * (1 - fx) + img[y0 + 1, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def compose(R0, t0, delta):
+    """
+    Rotation and translation after applying a correction to (R0, t0).
+    """
+    # scipy is imported on first use; it takes longer to import than the whole server
+    from scipy.spatial.transform import Rotation
+    R = Rotation.from_rotvec(np.radians(delta[3:])).as_matrix() @ R0
+    return R, t0 + np.asarray(delta[:3])
+
+
+def to_extrinsic(R, t):
+    # config.json convention: R = Rz(yaw) @ Ry(pitch) @ Rx(roll), degrees
+    from scipy.spatial.transform import Rotation
+    yaw, pitch, roll = Rotation.from_matrix(R).as_euler('ZYX', degrees=True)
+    return {"x": float(t[0]), "y": float(t[1]), "z": float(t[2]),
+            "roll": float(roll), "pitch": float(pitch), "yaw": float(yaw)}
+
+
+class EdgeAlignmentCost:
+    """
+    Mean clipped distance from projected LiDAR depth edges to image edges,
+    over several frames, as a function of a 6-DoF correction (see compose)
+    to the starting extrinsic.
+
+    Only edge points that project near the image at the starting pose take
+    part; one that leaves the image costs the clip distance, so the optimizer
+    cannot improve the score by pushing points out of view.
+    """
+
+    def __init__(self, camera, frames, scale=FEATURE_SCALE):
+        # frames: list of (edge points (N, 3), feature_cache edge distance map at `scale`)
+        self.camera = camera
+        e = camera['extrinsic']
+        self.R0 = get_rotation_matrix(e['roll'], e['pitch'], e['yaw'])
+        self.t0 = np.array([e['x'], e['y'], e['z']], dtype=np.float64)
+        self.model = camera_from_config(camera, dtype=np.float64)
+        self.scale = scale
+        self.tau = STAGES[0][0]
+        self.evaluations = 0
+
+        self.frames = []
+        margin_u = 0.1 * self.model.width
+        margin_v = 0.1 * self.model.height
+        for points, dist in frames:
+            uv, depth, valid = self.model.project(points, cull=False)
+            near = valid & (uv[:, 0] > -margin_u) & (uv[:, 0] < self.model.width + margin_u) \
+                & (uv[:, 1] > -margin_v) & (uv[:, 1] < self.model.height + margin_v)
+            if near.any():
+                self.frames.append((np.ascontiguousarray(points[near]), dist))
+        self.num_points = sum(len(p) for p, _ in self.frames)
+
+    def __call__(self, delta):
+        self.evaluations += 1
+        if self.num_points == 0:
+            return 0.0
+        R, t = compose(self.R0, self.t0, delta)
+
+        total = 0.0
+        for points, dist in self.frames:
+            uv, _, valid = self.model.project_camera_frame(points @ R.T + t, cull=False)
+            u = uv[:, 0] * self.scale
+            v = uv[:, 1] * self.scale
+            h, w = dist.shape
+            inside = valid & (u >= 0) & (u <= w - 1) & (v >= 0) & (v <= h - 1)
+            d = sample_bilinear(dist, u[inside], v[inside]) * (DIST_STEP / self.scale)
+            total += np.minimum(d, self.tau).sum() + self.tau * (len(points) - len(d))
+        return total / self.num_points
+
+
+def refine_extrinsic(camera, frames, progress=None, should_stop=None):
+    """
+    Optimize a camera's extrinsic by edge alignment (see EdgeAlignmentCost)
+    with Powell's method, coarse-to-fine over STAGES.
+
+    progress(fraction, cost) is called as evaluations proceed; should_stop()
+    returning True aborts with InterruptedError.
+
+    Returns a dict with the refined extrinsic, the starting and final cost
+    (mean pixel distance at the finest clip) and the number of points used.
+    """
+    from scipy.optimize import minimize
+    cost = EdgeAlignmentCost(camera, frames)
+    if cost.num_points == 0:
+        raise ValueError("No LiDAR depth edges project into this camera")
+
+    budget = sum(n for _, n, _ in STAGES)
+    done = 0
+    cost.tau = STAGES[-1][0]
+    initial = cost(np.zeros(6))
+
+    x = np.zeros(6)
+    for tau, maxfev, (radius_t, radius_r) in STAGES:
+        cost.tau = tau
+        start = cost.evaluations
+        radius = np.array([radius_t] * 3 + [radius_r] * 3)
+        bounds = list(zip((x - radius) / PARAM_SCALE, (x + radius) / PARAM_SCALE))
+
+        def scaled(p):
+            if should_stop is not None and should_stop():
+                raise InterruptedError("Calibration cancelled")
+            value = cost(p * PARAM_SCALE)
+            if progress is not None:
+                progress(min((done + cost.evaluations - start) / budget, 0.99), value)
+            return value
+
+        result = minimize(scaled, x / PARAM_SCALE, method='Powell', bounds=bounds,
+                          options={'maxfev': maxfev, 'xtol': 1e-2, 'ftol': 1e-4})
+        x = result.x * PARAM_SCALE
+        done += maxfev
+
+    final = cost(x)
+    R, t = compose(cost.R0, cost.t0, x)
+    return {
+        "extrinsic": to_extrinsic(R, t),
+        "translation_delta": [float(d) for d in x[:3]],
+        "rotation_delta_deg": [float(d) for d in x[3:]],
+        "initial_cost": float(initial),
+        "final_cost": float(final),
+        "points": cost.num_points,
+        "evaluations": cost.evaluations,
+    }
+
+
+def alignment_score(camera, points, dist):
+    """
+    Edge alignment of one camera on one frame at its current extrinsic:
+    (mean clipped pixel distance at SCORE_CLIP, number of edge points used),
+    or (None, 0) if no LiDAR edges project into the camera.
+    """
+    cost = EdgeAlignmentCost(camera, [(points, dist)])
+    if cost.num_points == 0:
+        return None, 0
+    cost.tau = SCORE_CLIP
+    return float(cost(np.zeros(6))), cost.num_points
+
+
+def load_frames(pairs, edge_points=scan_edge_points, edge_distance=edge_distance_map, workers=4):
+    """
+    Edge points and edge distance maps for (scan, image) pairs, read in
+    parallel with edge_points(scan) and edge_distance(image). By default
+    these are a PCD path and an image path; callers with caches pass keys
+    and their own loaders.
+    """
+    def load(pair):
+        scan, image = pair
+        return edge_points(scan), edge_distance(image)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(load, pairs))
+
+
+class CalibrationJobs:
+    """
+    Background calibration jobs, run one at a time on a worker thread.
+    Jobs are plain dicts (see _new_job) readable while they run.
+    """
+
+    def __init__(self, edge_points=scan_edge_points, edge_distance=edge_distance_map, keep=50):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calibrate")
+        # Loaders for the (scan, image) pairs of a job, see load_frames
+        self.edge_points = edge_points
+        self.edge_distance = edge_distance
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._keep = keep
+
+    def _new_job(self, port, frames):
+        return {
+            "id": uuid.uuid4().hex[:12],
+            "port": port,
+            "frames": frames,
+            "status": "queued",
+            "progress": 0.0,
+            "cost": None,
+            "result": None,
+            "error": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "cancel": False,
+        }
+
+    def start(self, port, camera, frame_pairs, frames):
+        """
+        Queue a refinement of `camera` (config entry) over frame_pairs
+        [(scan, image)] (see load_frames). Returns the job id.
+        """
+        job = self._new_job(port, frames)
+        with self._lock:
+            self._jobs[job["id"]] = job
+            # Forget the oldest finished jobs
+            finished = [j for j in self._jobs.values() if j["finished"] is not None]
+            for old in sorted(finished, key=lambda j: j["finished"])[:max(0, len(self._jobs) - self._keep)]:
+                del self._jobs[old["id"]]
+        self._executor.submit(self._run, job, camera, frame_pairs)
+        return job["id"]
+
+    def _run(self, job, camera, frame_pairs):
+        if job["cancel"]:
+            job.update(status="cancelled", finished=time.time())
+            return
+        job.update(status="running", started=time.time())
+
+        def progress(fraction, cost):
+            job["progress"] = fraction
+            job["cost"] = cost
+
+        try:
+            frames = load_frames(frame_pairs, self.edge_points, self.edge_distance)
+            result = refine_extrinsic(camera, frames, progress, lambda: job["cancel"])
+            job.update(status="done", progress=1.0, cost=result["final_cost"], result=result)
+        except InterruptedError:
+            job["status"] = "cancelled"
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+        job["finished"] = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else {k: v for k, v in job.items() if k != "cancel"}
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job["cancel"] = True
+            return True
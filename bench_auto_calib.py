@@ -0,0 +1,87 @@
+"""
+Synthetic check of auto_calib: ray-casts a scene of boxes into a LiDAR scan
+and a camera image with a known extrinsic, perturbs the extrinsic and reports
+how much of the error the edge-alignment refinement removes, and how long it
+takes.
+
+Usage:
+    python bench_auto_calib.py [--frames 3] [--beams 64] [--columns 2048]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from auto_calib import load_frames, refine_extrinsic, EXTRINSIC_KEYS
+from camera_models import get_rotation_matrix
+from pcd_loader import save_pcd
+from synthetic_scene import render_scan, render_image
+
+# Camera looking along LiDAR +x, close to gimbal lock like the real front camera
+TRUE_EXTRINSIC = {"x": 0.05, "y": -0.3, "z": -0.2, "roll": -90, "pitch": -87, "yaw": 177.3}
+INTRINSIC = {"fx": 1318.33, "fy": 1318.33, "cx": 960, "cy": 640}
+PERTURBATION = {"x": 0.08, "y": -0.06, "z": 0.05, "roll": 1.2, "pitch": -0.8, "yaw": 1.0}
+
+
+def make_boxes(seed):
+    # Axis-aligned boxes (lo, hi) in front of the sensor, plus ground and a back wall
+    rng = np.random.default_rng(seed)
+    boxes = []
+    for _ in range(14):
+        cx, cy = rng.uniform(6, 28), rng.uniform(-12, 12)
+        sx, sy, sz = rng.uniform(0.5, 2.5), rng.uniform(0.5, 3.0), rng.uniform(0.8, 3.5)
+        boxes.append(((cx - sx, cy - sy, -1.8), (cx + sx, cy + sy, -1.8 + sz)))
+    boxes.append(((-60, -60, -2.2), (60, 60, -1.8)))   # ground
+    boxes.append(((40, -60, -2.2), (41, 60, 12)))       # back wall
+    return np.array(boxes, dtype=np.float64)
+
+def pose_error(a, b):
+    trans = np.linalg.norm([a[k] - b[k] for k in ('x', 'y', 'z')])
+    Ra = get_rotation_matrix(a['roll'], a['pitch'], a['yaw'])
+    Rb = get_rotation_matrix(b['roll'], b['pitch'], b['yaw'])
+    angle = np.degrees(np.arccos(np.clip((np.trace(Ra.T @ Rb) - 1) / 2, -1, 1)))
+    return trans, angle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic auto-calibration check")
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--beams", type=int, default=64)
+    parser.add_argument("--columns", type=int, default=2048)
+    args = parser.parse_args()
+
+    start = {k: TRUE_EXTRINSIC[k] + PERTURBATION[k] for k in EXTRINSIC_KEYS}
+    with tempfile.TemporaryDirectory() as tmp:
+        pairs = []
+        for i in range(args.frames):
+            boxes = make_boxes(seed=i)
+            pcd = os.path.join(tmp, f"{i}.pcd")
+            img = os.path.join(tmp, f"{i}.png")
+            points = render_scan(boxes, args.beams, args.columns)
+            save_pcd(pcd, {"x": points[:, 0], "y": points[:, 1], "z": points[:, 2]}, width=args.columns)
+            cv2.imwrite(img, render_image(boxes, TRUE_EXTRINSIC, INTRINSIC, seed=i))
+            pairs.append((pcd, img))
+
+        t0 = time.perf_counter()
+        frames = load_frames(pairs)
+        t1 = time.perf_counter()
+        result = refine_extrinsic({"intrinsic": INTRINSIC, "extrinsic": start}, frames)
+        t2 = time.perf_counter()
+
+    before = pose_error(start, TRUE_EXTRINSIC)
+    after = pose_error(result["extrinsic"], TRUE_EXTRINSIC)
+    print(f"edge points used   {result['points']}")
+    print(f"cost               {result['initial_cost']:.2f} px -> {result['final_cost']:.2f} px")
+    print(f"translation error  {before[0] * 100:.1f} cm -> {after[0] * 100:.1f} cm")
+    print(f"rotation error     {before[1]:.2f} deg -> {after[1]:.2f} deg")
+    print(f"time               load {t1 - t0:.2f} s, optimize {t2 - t1:.2f} s ({result['evaluations']} evaluations)")
+    if after[1] > before[1] / 2:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Accuracy check and throughput benchmark for camera_models against OpenCV.
+
+Accuracy: each model is compared with cv2.projectPoints (5-coefficient Brown
+and 8-coefficient rational) or cv2.fisheye.projectPoints (Kannala-Brandt).
+The script exits non-zero if any model differs by more than --tolerance px.
+
+Throughput: projection of --points points (default 1M), NumPy models with
+preallocated output buffers vs. cv2.
+
+Usage:
+    python bench_camera_models.py [--points 1000000] [--repeat 5] [--tolerance 0.01]
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera_models import camera_from_config, get_rotation_matrix
+
+EXTRINSIC = {"x": 0.1, "y": -0.2, "z": 0.3, "roll": -90, "pitch": 0, "yaw": -90}
+
+INTRINSICS = {
+    "pinhole": {
+        "fx": 1318.33, "fy": 1318.33, "cx": 960, "cy": 640,
+        "k1": -0.32, "k2": 0.12, "p1": 0.0012, "p2": -0.0008, "k3": -0.02,
+    },
+    "rational": {
+        "model": "rational",
+        "fx": 950.0, "fy": 950.0, "cx": 960, "cy": 640,
+        "k1": 0.8, "k2": 0.1, "p1": 0.0004, "p2": -0.0003, "k3": 0.002,
+        "k4": 1.15, "k5": 0.25, "k6": 0.01,
+    },
+    "fisheye": {
+        "model": "fisheye",
+        "fx": 520.0, "fy": 520.0, "cx": 960, "cy": 640,
+        "k1": 0.05, "k2": -0.01, "k3": 0.002, "k4": -0.0003,
+        "fov": 190,
+    },
+}
+
+
+def make_points(n, seed=0):
+    # Points in a shell around the sensor, like a LiDAR sweep
+    rng = np.random.default_rng(seed)
+    az = rng.uniform(-np.pi, np.pi, n)
+    el = rng.uniform(-0.4, 0.4, n)
+    r = rng.uniform(2, 60, n)
+    return np.stack([r * np.cos(el) * np.cos(az), r * np.cos(el) * np.sin(az), r * np.sin(el)], axis=-1)
+
+
+def opencv_reference(points, intrinsic, extrinsic):
+    """
+    Project with OpenCV. Returns (uv, mask) where mask marks the points that
+    were projected (in front of the camera).
+    """
+    R = get_rotation_matrix(extrinsic['roll'], extrinsic['pitch'], extrinsic['yaw'])
+    t = np.array([extrinsic['x'], extrinsic['y'], extrinsic['z']])
+    cam = points @ R.T + t
+    mask = cam[:, 2] > 0.1
+    cam = cam[mask]
+    K = np.array([[intrinsic['fx'], 0, intrinsic['cx']], [0, intrinsic['fy'], intrinsic['cy']], [0, 0, 1]], dtype=np.float64)
+    model = intrinsic.get('model', 'pinhole')
+    g = intrinsic.get
+
+    if model == 'fisheye':
+        D = np.array([g('k1', 0), g('k2', 0), g('k3', 0), g('k4', 0)], dtype=np.float64)
+        uv, _ = cv2.fisheye.projectPoints(cam.reshape(-1, 1, 3), np.zeros(3), np.zeros(3), K, D)
+    else:
+        if model == 'rational':
+            D = np.array([g('k1', 0), g('k2', 0), g('p1', 0), g('p2', 0), g('k3', 0), g('k4', 0), g('k5', 0), g('k6', 0)])
+        else:
+            D = np.array([g('k1', 0), g('k2', 0), g('p1', 0), g('p2', 0), g('k3', 0)])
+        uv, _ = cv2.projectPoints(cam, np.zeros(3), np.zeros(3), K, D)
+    return uv.reshape(-1, 2), mask
+
+
+def check_accuracy(tolerance, n=200000):
+    points = make_points(n, seed=1)
+    ok = True
+    for name, intrinsic in INTRINSICS.items():
+        camera = camera_from_config({"intrinsic": intrinsic, "extrinsic": EXTRINSIC}, dtype=np.float64)
+        uv, _, valid = camera.project(points, cull=False)
+        ref, ref_mask = opencv_reference(points, intrinsic, EXTRINSIC)
+
+        # Compare where both consider the point projectable and it lands near the image
+        both = valid & ref_mask
+        ref_full = np.full((n, 2), np.nan)
+        ref_full[ref_mask] = ref
+        near = both & (np.abs(ref_full[:, 0] - 960) < 4000) & (np.abs(ref_full[:, 1] - 640) < 4000)
+        err = np.abs(uv[near] - ref_full[near]).max() if near.any() else 0.0
+
+        camera32 = camera_from_config({"intrinsic": intrinsic, "extrinsic": EXTRINSIC})
+        uv32, _, _ = camera32.project(points.astype(np.float32), cull=False)
+        err32 = np.abs(uv32[near] - ref_full[near]).max() if near.any() else 0.0
+
+        passed = err <= tolerance and err32 <= max(tolerance, 0.05)
+        ok &= passed
+        print(f"{name:<9} {near.sum():7d} pts  max |err| float64 {err:.2e} px  float32 {err32:.2e} px  {'OK' if passed else 'FAIL'}")
+    return ok
+
+
+def bench(n, repeat):
+    points = make_points(n).astype(np.float32)
+    uv = np.empty((n, 2), dtype=np.float32)
+    depth = np.empty(n, dtype=np.float32)
+    valid = np.empty(n, dtype=bool)
+
+    for name, intrinsic in INTRINSICS.items():
+        camera = camera_from_config({"intrinsic": intrinsic, "extrinsic": EXTRINSIC})
+        camera.project(points, uv, depth, valid)  # warm the scratch buffers
+
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            camera.project(points, uv, depth, valid)
+            times.append(time.perf_counter() - t0)
+        ours = np.median(times)
+
+        points64 = points.astype(np.float64)
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            opencv_reference(points64, intrinsic, EXTRINSIC)
+            times.append(time.perf_counter() - t0)
+        ref = np.median(times)
+
+        print(f"{name:<9} camera_models {ours * 1000:7.1f} ms ({n / ours / 1e6:5.1f} Mpts/s)   "
+              f"cv2 {ref * 1000:7.1f} ms ({n / ref / 1e6:5.1f} Mpts/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera model accuracy and throughput")
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print("Accuracy vs OpenCV")
+    ok = check_accuracy(args.tolerance)
+    print(f"\nThroughput, {args.points} points")
+    bench(args.points, args.repeat)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
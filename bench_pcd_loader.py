@@ -0,0 +1,117 @@
+"""
+Micro-benchmark: pcd_loader.load_pcd vs. the previous f.read + np.stack loader.
+
+Generates synthetic OS2-like frames (128 beams x 2048 columns) in ascii,
+binary and binary_compressed form and times loading each one.
+
+Usage:
+    python bench_pcd_loader.py [--beams 128] [--columns 2048] [--repeat 10]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from pcd_loader import load_pcd, save_pcd
+
+
+def load_pcd_legacy(file_path):
+    # The loader as it was before memory mapping (binary and ascii only)
+    with open(file_path, 'rb') as f:
+        header = []
+        while True:
+            line = f.readline().decode('ascii').strip()
+            header.append(line)
+            if line.startswith('DATA'):
+                break
+        header_map = {}
+        for line in header:
+            parts = line.split()
+            header_map[parts[0]] = parts[1:]
+        data_type = header_map['DATA'][0]
+        points_count = int(header_map['POINTS'][0])
+        fields = header_map['FIELDS']
+        x_idx, y_idx, z_idx = fields.index('x'), fields.index('y'), fields.index('z')
+
+        if data_type == 'binary':
+            sizes = [int(s) for s in header_map['SIZE']]
+            raw_data = f.read(points_count * sum(sizes))
+            types_map = {'F': 'f', 'I': 'i', 'U': 'u'}
+            dtype_list = [(field, f"{types_map[header_map['TYPE'][i]]}{header_map['SIZE'][i]}")
+                          for i, field in enumerate(fields)]
+            data = np.frombuffer(raw_data, dtype=dtype_list)
+            points = np.stack([data['x'], data['y'], data['z']], axis=-1)
+            return points.astype(np.float32)
+        elif data_type == 'ascii':
+            data = np.loadtxt(f)
+            return data[:, [x_idx, y_idx, z_idx]].astype(np.float32)
+        raise ValueError(f"Unsupported DATA type: {data_type}")
+
+
+def make_os2_frame(beams, columns, seed=0):
+    """
+    Synthetic ring-ordered scan with the Ouster field layout
+    (x y z intensity t reflectivity ring ambient range).
+    """
+    rng = np.random.default_rng(seed)
+    az = np.linspace(0, 2 * np.pi, columns, endpoint=False)[None, :]
+    el = np.radians(np.linspace(-22.5, 22.5, beams))[:, None]
+    r = (5 + 40 * rng.random((beams, columns))).astype(np.float32)
+    n = beams * columns
+    return {
+        'x': (r * np.cos(el) * np.cos(az)).astype(np.float32).ravel(),
+        'y': (r * np.cos(el) * np.sin(az)).astype(np.float32).ravel(),
+        'z': (r * np.sin(el)).astype(np.float32).ravel(),
+        'intensity': rng.random(n).astype(np.float32),
+        't': np.tile(np.arange(columns, dtype=np.uint32) * 48828, beams),
+        'reflectivity': rng.integers(0, 255, n).astype(np.uint16),
+        'ring': np.repeat(np.arange(beams, dtype=np.uint16), columns),
+        'ambient': rng.integers(0, 4096, n).astype(np.uint16),
+        'range': (r.ravel() * 1000).astype(np.uint32),
+    }
+
+
+def time_loader(fn, path, repeat, touch=True):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pts = fn(path)
+        if touch:
+            # Reading the values forces the mmap pages in, so the comparison is fair
+            pts.sum(axis=0)
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000, len(pts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PCD loading")
+    parser.add_argument("--beams", type=int, default=128)
+    parser.add_argument("--columns", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    frame = make_os2_frame(args.beams, args.columns)
+    print(f"Frame: {args.beams} beams x {args.columns} columns = {args.beams * args.columns} points")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for data in ('binary', 'binary_compressed', 'ascii'):
+            path = os.path.join(tmp, f"frame_{data}.pcd")
+            save_pcd(path, frame, data)
+            size_mb = os.path.getsize(path) / 1e6
+            # ASCII is slow enough that a couple of runs are plenty
+            repeat = max(1, args.repeat // 5) if data == 'ascii' else args.repeat
+
+            new_ms, n = time_loader(load_pcd, path, repeat)
+            line = f"{data:<18} {size_mb:7.1f} MB  load_pcd {new_ms:8.2f} ms"
+            if data != 'binary_compressed':
+                old_ms, _ = time_loader(load_pcd_legacy, path, repeat)
+                line += f"  legacy {old_ms:8.2f} ms  speedup {old_ms / new_ms:5.1f}x"
+            else:
+                line += "  legacy (unsupported)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
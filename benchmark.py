@@ -0,0 +1,354 @@
+"""
+Benchmark suite on synthetic scenes (see synthetic_scene), so changes to the
+PCD loader, projection or the point endpoints can be compared run to run.
+
+Stages, each timed over --repeat runs (median / p95 / min, milliseconds):
+    parse.<format>        pcd_loader.load_pcd of one frame, values touched
+    parse.columnar        preprocess.load_pts of the same frame (already LOD-ordered,
+                          so it replaces both parse and build_lod)
+    downsample.build_lod  lod.build_lod (voxel-pass reordering) of one frame
+    serialize.<format>    encoding MAX_POINTS points for /api/points (f32, i16, json)
+    project.points        calibration_utils.project_points, once per camera
+    project.multi         calibration_utils.project_points_multi, all cameras at once
+    startup.import        `import server` in a fresh interpreter (interpreter start excluded)
+    startup.first_request launching uvicorn until the first /api/scenes response
+    http.*                requests to a uvicorn server started on the scenes:
+                          cold (first touch of each frame) and warm latency of
+                          /api/points, /api/projection, /api/bundle and
+                          /api/image, and /api/points throughput with
+                          --concurrency clients (requests/s, MB/s)
+
+Results are written as JSON to bench_results/<time>-<commit>.json.
+--compare OLD.json prints the change of every metric and exits non-zero if
+one got worse by more than --threshold.
+
+Usage:
+    python benchmark.py [--frames 8] [--beams 128] [--columns 2048] [--repeat 10]
+                        [--concurrency 4] [--skip-http] [--work-dir DIR]
+                        [--compare bench_results/OLD.json] [--threshold 0.1]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from calibration_utils import project_points, project_points_multi
+from lod import build_lod
+from pcd_loader import load_pcd
+from point_codec import encode_points
+from preprocess import convert_frame, load_pts
+from scene_manifest import LIDAR_DIR
+from synthetic_scene import PCD_FORMATS, generate_scene
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_DIR, "bench_results")
+# Points per /api/points response (server.MAX_POINTS)
+POINTS_PER_RESPONSE = 150000
+SERVER_START_TIMEOUT = 60
+IMPORT_SCRIPT = "import time; t0 = time.perf_counter(); import server; print(time.perf_counter() - t0)"
+
+
+def summarize(times_s, **extra):
+    ms = np.asarray(times_s) * 1000
+    return {"unit": "ms", "median": float(np.median(ms)), "p95": float(np.percentile(ms, 95)),
+            "min": float(ms.min()), "runs": len(ms), **extra}
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                             capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def scene_name(pcd_format):
+    return f"synthetic_{pcd_format}"
+
+
+def pcd_path(data_root, pcd_format, frame=0):
+    return os.path.join(data_root, scene_name(pcd_format), "paired", LIDAR_DIR, f"{frame}.pcd")
+
+
+def bench_offline(data_root, repeat):
+    results = {}
+    for fmt in PCD_FORMATS:
+        path = pcd_path(data_root, fmt)
+        # ASCII is slow enough that a couple of runs are plenty
+        runs = max(2, repeat // 5) if fmt == 'ascii' else repeat
+        # Summing forces memory-mapped pages in, so formats compare fairly
+        results[f"parse.{fmt}"] = summarize(timed(lambda: load_pcd(path).sum(axis=0), runs),
+                                            bytes=os.path.getsize(path))
+
+    # Outside data_root, so the HTTP stages still parse PCDs
+    with tempfile.TemporaryDirectory() as tmp:
+        pts_path = os.path.join(tmp, "0.pts")
+        convert_frame(pcd_path(data_root, 'binary'), pts_path)
+        results["parse.columnar"] = summarize(timed(lambda: load_pts(pts_path).points.sum(axis=0), repeat),
+                                              bytes=os.path.getsize(pts_path))
+
+    points = np.array(load_pcd(pcd_path(data_root, 'binary')))
+    results["downsample.build_lod"] = summarize(timed(lambda: build_lod(points), repeat), points=len(points))
+
+    lod = build_lod(points)
+    subset = lod.points[:POINTS_PER_RESPONSE]
+    for fmt in ("f32", "i16"):
+        results[f"serialize.{fmt}"] = summarize(timed(lambda: b"".join(encode_points(subset, fmt)), repeat),
+                                                points=len(subset))
+    results["serialize.json"] = summarize(timed(lambda: json.dumps({"points": subset.tolist()}).encode('utf-8'),
+                                                max(2, repeat // 5)), points=len(subset))
+
+    with open(os.path.join(data_root, scene_name('binary'), "paired", "config.json")) as f:
+        cameras = list(json.load(f)["cameras"].values())
+    results["project.points"] = summarize(
+        timed(lambda: [project_points(subset, c['intrinsic'], c['extrinsic']) for c in cameras], repeat),
+        points=len(subset), cameras=len(cameras))
+    results["project.multi"] = summarize(timed(lambda: project_points_multi(subset, cameras), repeat),
+                                         points=len(subset), cameras=len(cameras))
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(cache_root):
+    return dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+                CACHE_ROOT=cache_root)
+
+
+def start_server(work_dir, cache_root, port):
+    """
+    uvicorn on the repo's server module with `work_dir` (holding data/ and
+    a static/ link) as the working directory and its caches in `cache_root`.
+    Returns the process and the seconds until it answered its first request.
+    """
+    env = server_env(cache_root)
+    log = open(os.path.join(work_dir, "server.log"), "wb")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+                             "--port", str(port), "--log-level", "warning"],
+                            cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited, see {log.name}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/scenes")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc, time.perf_counter() - t0
+        except OSError:
+            time.sleep(0.02)
+    proc.kill()
+    raise RuntimeError("Server did not start in time")
+
+
+def bench_import(work_dir, cache_root, repeat):
+    # Each run in a fresh interpreter; the OS file cache is warm after the first
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=work_dir, env=server_env(cache_root),
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]))
+    return summarize(times)
+
+
+def fetch(conn, path):
+    # One request on a keep-alive connection; returns (seconds, body bytes)
+    t0 = time.perf_counter()
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    elapsed = time.perf_counter() - t0
+    if response.status != 200:
+        raise RuntimeError(f"GET {path}: HTTP {response.status} {body[:200]!r}")
+    return elapsed, len(body)
+
+
+def bench_http(port, frames, repeat, concurrency):
+    results = {}
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    binary = scene_name('binary')
+    endpoints = {
+        "points": "/api/points/{f}?scene={s}&format=i16&prefetch=0",
+        "projection": "/api/projection/{f}?scene={s}&prefetch=0",
+        "bundle": "/api/bundle/{f}?scene={s}&format=i16&size=640&prefetch=0",
+        "image": "/api/image/port_1/{f}?scene={s}&size=640",
+    }
+
+    # Cold: first request for each frame (PCD parse, LOD, image resize on the server)
+    for fmt in PCD_FORMATS:
+        scene = scene_name(fmt)
+        samples = [fetch(conn, endpoints["points"].format(f=f, s=scene)) for f in frames]
+        results[f"http.points.cold.{fmt}"] = summarize([t for t, _ in samples],
+                                                       bytes=int(np.mean([n for _, n in samples])))
+    samples = [fetch(conn, endpoints["image"].format(f=f, s=binary)) for f in frames]
+    results["http.image.cold"] = summarize([t for t, _ in samples], bytes=int(np.mean([n for _, n in samples])))
+
+    # Warm: everything cached server-side
+    for name, template in endpoints.items():
+        paths = [template.format(f=f, s=binary) for f in frames]
+        for p in paths:
+            fetch(conn, p)
+        samples = [fetch(conn, p) for _ in range(repeat) for p in paths]
+        results[f"http.{name}.warm"] = summarize([t for t, _ in samples], bytes=int(np.mean([n for _, n in samples])))
+    conn.close()
+
+    # Throughput: clients hammering warm /api/points on their own connections
+    paths = [endpoints["points"].format(f=f, s=binary) for f in frames]
+    per_client = repeat * len(paths)
+    totals = []
+
+    def client():
+        c = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        sent = 0
+        for i in range(per_client):
+            sent += fetch(c, paths[i % len(paths)])[1]
+        c.close()
+        totals.append(sent)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if len(totals) != concurrency:
+        raise RuntimeError("A throughput client failed")
+    results["http.points.throughput"] = {"unit": "req/s", "value": concurrency * per_client / elapsed,
+                                         "mb_per_s": sum(totals) / elapsed / 1e6,
+                                         "concurrency": concurrency, "requests": concurrency * per_client}
+    return results
+
+
+def metric_value(result):
+    return result["value"] if "value" in result else result["median"]
+
+
+def compare(old_results, new_results, threshold):
+    """
+    Print the change of each metric present in both runs. Returns the names
+    of the metrics that got worse by more than `threshold` (a fraction).
+    """
+    worse = []
+    print(f"\n{'metric':<36} {'old':>10} {'new':>10} {'change':>8}")
+    for name, new in new_results.items():
+        old = old_results.get(name)
+        if old is None or old.get("unit") != new.get("unit"):
+            continue
+        a, b = metric_value(old), metric_value(new)
+        if a == 0:
+            continue
+        change = b / a - 1
+        # Latencies should go down, throughput up
+        regression = change > threshold if new["unit"] == "ms" else change < -threshold
+        if regression:
+            worse.append(name)
+        print(f"{name:<36} {a:10.2f} {b:10.2f} {change:+8.1%}{'  WORSE' if regression else ''}")
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing, LOD, encoding, projection and HTTP")
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--beams", type=int, default=128)
+    parser.add_argument("--columns", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--work-dir", default=None,
+                        help="keep generated scenes in WORK_DIR/data and reuse them on later runs (default: temporary)")
+    parser.add_argument("--output", default=None, help="result file (default: bench_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The server reads data/ and static/ relative to its working directory
+        work_dir = os.path.abspath(args.work_dir or tmp)
+        data_root = os.path.join(work_dir, "data")
+        for fmt in PCD_FORMATS:
+            if not os.path.exists(pcd_path(data_root, fmt, args.frames - 1)):
+                t0 = time.perf_counter()
+                generate_scene(os.path.join(data_root, scene_name(fmt)), args.frames, fmt, args.beams, args.columns)
+                print(f"Generated {scene_name(fmt)} ({args.frames} frames) in {time.perf_counter() - t0:.1f} s")
+
+        results = bench_offline(data_root, args.repeat)
+        if not args.skip_http:
+            static = os.path.join(work_dir, "static")
+            if not os.path.exists(static):
+                os.symlink(os.path.join(REPO_DIR, "static"), static)
+            port = free_port()
+            # Fresh server caches every run, even when the scenes are reused
+            cache_root = os.path.join(tmp, "cache")
+            results["startup.import"] = bench_import(work_dir, cache_root, args.repeat)
+            proc, first_request = start_server(work_dir, cache_root, port)
+            results["startup.first_request"] = summarize([first_request])
+            try:
+                results.update(bench_http(port, [str(f) for f in range(args.frames)], args.repeat, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    for name, r in results.items():
+        if r["unit"] == "ms":
+            print(f"{name:<36} median {r['median']:9.2f} ms  p95 {r['p95']:9.2f} ms")
+        else:
+            print(f"{name:<36} {r['value']:9.1f} {r['unit']}  {r['mb_per_s']:.1f} MB/s")
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "frames": args.frames, "beams": args.beams, "columns": args.columns,
+            "repeat": args.repeat, "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(json.load(f)["results"], results, args.threshold)
+        if worse:
+            print(f"\n{len(worse)} metric(s) worse by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,7 @@
 import numpy as np
-import cv2
 
-def get_rotation_matrix(roll, pitch, yaw):
-    """
-    Returns 3x3 rotation matrix from Euler angles (in degrees).
-    Order: Roll -> Pitch -> Yaw (Extrinsic rotation usually)
-    But for camera extrinsics, it depends on definition.
-    Here we assume R = Rz(yaw) * Ry(pitch) * Rx(roll)
-    """
-    roll = np.radians(roll)
-    pitch = np.radians(pitch)
-    yaw = np.radians(yaw)
-
-    rx = np.array([
-        [1, 0, 0],
-        [0, np.cos(roll), -np.sin(roll)],
-        [0, np.sin(roll), np.cos(roll)]
-    ])
-
-    ry = np.array([
-        [np.cos(pitch), 0, np.sin(pitch)],
-        [0, 1, 0],
-        [-np.sin(pitch), 0, np.cos(pitch)]
-    ])
-
-    rz = np.array([
-        [np.cos(yaw), -np.sin(yaw), 0],
-        [np.sin(yaw), np.cos(yaw), 0],
-        [0, 0, 1]
-    ])
-
-    return rz @ ry @ rx
+# Camera geometry lives in camera_models; re-exported here for existing callers
+from camera_models import get_rotation_matrix, camera_from_config, project_rig, DEFAULT_IMAGE_SIZE, MIN_DEPTH
 
 def project_points(points_3d, intrinsic, extrinsic):
     """
@@ -38,66 +9,53 @@ def project_points(points_3d, intrinsic, extrinsic):
     
     points_3d: (N, 3) numpy array
     intrinsic: dict with fx, fy, cx, cy, k1, k2, etc.
+               (optional 'model': 'pinhole' | 'rational' | 'fisheye')
     extrinsic: dict with x, y, z, roll, pitch, yaw
     
     Returns:
-        points_2d: (N, 2) pixels
+        points_2d: (M, 2) pixels of the valid points
         mask: (N,) boolean mask of valid points (in front of camera)
     """
-    # Extrinsic: LiDAR to Camera transform
-    # Usually extrinsic is defined as Transform from LiDAR to Camera
-    # T_cam_lidar = [R | t]
-    
-    R = get_rotation_matrix(extrinsic['roll'], extrinsic['pitch'], extrinsic['yaw'])
-    t = np.array([[extrinsic['x']], [extrinsic['y']], [extrinsic['z']]])
-    
-    # Transform points to camera coordinate system
-    # P_cam = R * P_lidar + t
-    points_cam = (R @ points_3d.T + t).T  # (N, 3)
-    
-    # Filter points behind camera (z < 0)
+    # Extrinsic: LiDAR to Camera transform, P_cam = R * P_lidar + t
     # Standard camera frame: Z forward, X right, Y down
-    # But LiDAR is usually: X forward, Y left, Z up
-    # The extrinsic R should handle the coordinate system change + rotation.
-    
-    mask = points_cam[:, 2] > 0.1
-    points_cam = points_cam[mask]
-    
-    if len(points_cam) == 0:
+    camera = camera_from_config({'intrinsic': intrinsic, 'extrinsic': extrinsic}, dtype=np.float64)
+    points_2d, _, mask = camera.project(points_3d, cull=False)
+
+    if not mask.any():
         return np.array([]), mask
 
-    # Project
-    K = np.array([
-        [intrinsic['fx'], 0, intrinsic['cx']],
-        [0, intrinsic['fy'], intrinsic['cy']],
-        [0, 0, 1]
-    ])
-    
-    dist_coeffs = np.array([
-        intrinsic.get('k1', 0), intrinsic.get('k2', 0), 
-        intrinsic.get('p1', 0), intrinsic.get('p2', 0), 
-        intrinsic.get('k3', 0)
-    ])
-    
-    # Use OpenCV for projection (handles distortion)
-    # cv2.projectPoints expects (N, 1, 3) or (N, 3)
-    # It also takes rvec and tvec. Since we already transformed points, 
-    # we can pass rvec=0, tvec=0 and pass points_cam as object points.
-    
-    # However, cv2.projectPoints projects 3D points given camera pose.
-    # Since points_cam are already in camera frame, we can just project them with Identity pose.
-    
-    points_2d, _ = cv2.projectPoints(
-        points_cam, 
-        np.zeros(3), np.zeros(3), 
-        K, dist_coeffs
-    )
-    
-    points_2d = points_2d.reshape(-1, 2)
-    
-    # We need to return the mask to know which original points were valid
-    # But we filtered points_cam.
-    # Let's return the filtered 2D points. The caller might want to know indices, 
-    # but for visualization we just need the 2D points.
-    
-    return points_2d, mask
+    # For visualization we just need the 2D points of the valid ones
+    return points_2d[mask], mask
+
+def project_points_multi(points_3d, cameras, min_depth=MIN_DEPTH, subsets=None):
+    """
+    Project 3D points (LiDAR frame) into several cameras at once.
+
+    points_3d: (N, 3) numpy array
+    cameras: list of camera config dicts with 'intrinsic' and 'extrinsic'
+             (intrinsic may carry 'width'/'height', default 1920x1280),
+             or prebuilt camera_models.CameraModel objects
+    subsets: optional index array per camera; camera c then only projects
+             points_3d[subsets[c]] (see camera_models.project_rig)
+
+    All cameras are transformed with one stacked (C, 3, 3) matmul, then each
+    camera's distortion model is applied vectorized.
+
+    Returns a list (one per camera) of dicts with:
+        index: (M,) indices into points_3d of points that land inside the image
+        uv:    (M, 2) float32 pixel coordinates
+        depth: (M,) float32 camera-frame depth
+    """
+    models = [c if hasattr(c, 'project') else camera_from_config(c) for c in cameras]
+
+    results = []
+    for c, (uv, depth, valid) in enumerate(project_rig(points_3d, models, subsets=subsets)):
+        if min_depth != MIN_DEPTH:
+            valid &= depth > min_depth
+        index = np.flatnonzero(valid)
+        results.append({
+            'index': index if subsets is None else subsets[c][index],
+            'uv': uv[index],
+            'depth': depth[index],
+        })
+    return results
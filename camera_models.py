@@ -0,0 +1,335 @@
+import threading
+import numpy as np
+
+# Points closer than this (camera-frame depth, metres) are never projected
+MIN_DEPTH = 0.1
+# Default image size of the cameras when the intrinsic does not specify one
+DEFAULT_IMAGE_SIZE = (1920, 1280)
+
+
+def get_rotation_matrix(roll, pitch, yaw):
+    """
+    Returns 3x3 rotation matrix from Euler angles (in degrees).
+    Order: Roll -> Pitch -> Yaw (Extrinsic rotation usually)
+    But for camera extrinsics, it depends on definition.
+    Here we assume R = Rz(yaw) * Ry(pitch) * Rx(roll)
+    """
+    roll = np.radians(roll)
+    pitch = np.radians(pitch)
+    yaw = np.radians(yaw)
+
+    rx = np.array([
+        [1, 0, 0],
+        [0, np.cos(roll), -np.sin(roll)],
+        [0, np.sin(roll), np.cos(roll)]
+    ])
+
+    ry = np.array([
+        [np.cos(pitch), 0, np.sin(pitch)],
+        [0, 1, 0],
+        [-np.sin(pitch), 0, np.cos(pitch)]
+    ])
+
+    rz = np.array([
+        [np.cos(yaw), -np.sin(yaw), 0],
+        [np.sin(yaw), np.cos(yaw), 0],
+        [0, 0, 1]
+    ])
+
+    return rz @ ry @ rx
+
+
+class CameraModel:
+    """
+    Precompiled camera: extrinsic rotation/translation, intrinsics and
+    distortion are parsed once from the config dicts, so projecting a frame
+    does no dict lookups or matrix rebuilding.
+
+    Projection writes into caller-provided buffers when given and otherwise
+    reuses per-thread scratch space, so steady-state projection of same-sized
+    clouds does not allocate.
+
+    Subclasses implement _distort(x_n, y_n, ...) on normalized coordinates
+    (or _project_camera_frame directly for non-pinhole geometry).
+    """
+
+    model = None
+
+    def __init__(self, intrinsic, extrinsic, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.R = get_rotation_matrix(extrinsic['roll'], extrinsic['pitch'], extrinsic['yaw']).astype(self.dtype)
+        # Row vectors: p_cam = p_lidar @ R^T + t
+        self.Rt = np.ascontiguousarray(self.R.T)
+        self.t = np.array([extrinsic['x'], extrinsic['y'], extrinsic['z']], dtype=self.dtype)
+
+        self.fx = float(intrinsic['fx'])
+        self.fy = float(intrinsic['fy'])
+        self.cx = float(intrinsic['cx'])
+        self.cy = float(intrinsic['cy'])
+        self.width = int(intrinsic.get('width', DEFAULT_IMAGE_SIZE[0]))
+        self.height = int(intrinsic.get('height', DEFAULT_IMAGE_SIZE[1]))
+        self._local = threading.local()
+
+    # Scratch buffers
+
+    def _workspace(self, n, names):
+        ws = getattr(self._local, 'ws', None)
+        if ws is None or ws['n'] < n:
+            # Grow with headroom so slightly larger clouds do not reallocate
+            size = max(n, int(getattr(self._local, 'size', 0) * 1.25))
+            ws = {'n': size, 'cam': np.empty((size, 3), dtype=self.dtype)}
+            self._local.ws = ws
+            self._local.size = size
+        out = []
+        for name in names:
+            buf = ws.get(name)
+            if buf is None:
+                buf = ws[name] = np.empty(ws['n'], dtype=self.dtype)
+            out.append(buf[:n])
+        return out
+
+    # Projection
+
+    def project(self, points, out_uv=None, out_depth=None, out_valid=None, cull=True):
+        """
+        Project (N, 3) LiDAR-frame points.
+
+        Returns (uv, depth, valid): (N, 2) pixels, (N,) camera-frame depth and
+        (N,) mask of points in front of the camera (and inside the image when
+        cull is True). Values of uv for invalid points are undefined.
+        """
+        n = len(points)
+        self._workspace(n, ())
+        cam = self._local.ws['cam'][:n]
+        np.matmul(np.asarray(points, dtype=self.dtype), self.Rt, out=cam)
+        cam += self.t
+        return self.project_camera_frame(cam, out_uv, out_depth, out_valid, cull)
+
+    def project_camera_frame(self, cam, out_uv=None, out_depth=None, out_valid=None, cull=True):
+        """
+        Same as project() for points already in the camera frame.
+        """
+        n = len(cam)
+        uv = np.empty((n, 2), dtype=self.dtype) if out_uv is None else out_uv
+        valid = np.empty(n, dtype=bool) if out_valid is None else out_valid
+        depth = np.empty(n, dtype=self.dtype) if out_depth is None else out_depth
+
+        depth[...] = cam[:, 2]
+        self._project_camera_frame(cam[:, 0], cam[:, 1], cam[:, 2], uv, valid)
+
+        if cull:
+            u = uv[:, 0]
+            v = uv[:, 1]
+            valid &= u >= 0
+            valid &= u < self.width
+            valid &= v >= 0
+            valid &= v < self.height
+        return uv, depth, valid
+
+    def _project_camera_frame(self, x, y, z, uv, valid):
+        # Pinhole family: normalize, distort, apply K
+        n = len(x)
+        inv_z, x_n, y_n, r2, tmp, tmp2 = self._workspace(n, ('inv_z', 'x_n', 'y_n', 'r2', 'tmp', 'tmp2'))
+
+        np.greater(z, MIN_DEPTH, out=valid)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(1, z, out=inv_z)
+        np.multiply(x, inv_z, out=x_n)
+        np.multiply(y, inv_z, out=y_n)
+
+        np.multiply(x_n, x_n, out=r2)
+        np.multiply(y_n, y_n, out=tmp)
+        r2 += tmp
+
+        u = uv[:, 0]
+        v = uv[:, 1]
+        with np.errstate(invalid='ignore', over='ignore'):
+            self._distort(x_n, y_n, r2, u, v, tmp, tmp2)
+            u *= self.fx
+            u += self.cx
+            v *= self.fy
+            v += self.cy
+
+    def _distort(self, x_n, y_n, r2, x_d, y_d, tmp, tmp2):
+        # Undistorted pinhole
+        x_d[...] = x_n
+        y_d[...] = y_n
+
+    @staticmethod
+    def _polyval_r2(r2, coeffs, out):
+        # out = 1 + c0*r2 + c1*r2^2 + ... (Horner)
+        out.fill(coeffs[-1])
+        for c in coeffs[-2::-1]:
+            out *= r2
+            out += c
+        out *= r2
+        out += 1
+        return out
+
+    @staticmethod
+    def _add_tangential(x_n, y_n, r2, p1, p2, x_d, y_d, tmp):
+        if p1 == 0 and p2 == 0:
+            return
+        # x_d += 2 p1 x y + p2 (r2 + 2 x^2)
+        # y_d += p1 (r2 + 2 y^2) + 2 p2 x y
+        np.multiply(x_n, y_n, out=tmp)
+        x_d += (2 * p1) * tmp
+        y_d += (2 * p2) * tmp
+        np.multiply(x_n, x_n, out=tmp)
+        tmp *= 2
+        tmp += r2
+        x_d += p2 * tmp
+        np.multiply(y_n, y_n, out=tmp)
+        tmp *= 2
+        tmp += r2
+        y_d += p1 * tmp
+
+
+class PinholeBrown(CameraModel):
+    """
+    Pinhole with the 5-coefficient Brown-Conrady model (k1, k2, p1, p2, k3),
+    equivalent to cv2.projectPoints with a 5-element distortion vector.
+    """
+
+    model = "pinhole"
+
+    def __init__(self, intrinsic, extrinsic, dtype=np.float32):
+        super().__init__(intrinsic, extrinsic, dtype)
+        self.k = [float(intrinsic.get(k, 0)) for k in ('k1', 'k2', 'k3')]
+        self.p1 = float(intrinsic.get('p1', 0))
+        self.p2 = float(intrinsic.get('p2', 0))
+
+    def _distort(self, x_n, y_n, r2, x_d, y_d, tmp, tmp2):
+        radial = self._polyval_r2(r2, self.k, tmp2)
+        np.multiply(x_n, radial, out=x_d)
+        np.multiply(y_n, radial, out=y_d)
+        self._add_tangential(x_n, y_n, r2, self.p1, self.p2, x_d, y_d, tmp)
+
+
+class Rational(CameraModel):
+    """
+    OpenCV rational model (k1..k6, p1, p2), i.e. cv2.CALIB_RATIONAL_MODEL:
+    radial = (1 + k1 r2 + k2 r4 + k3 r6) / (1 + k4 r2 + k5 r4 + k6 r6).
+    """
+
+    model = "rational"
+
+    def __init__(self, intrinsic, extrinsic, dtype=np.float32):
+        super().__init__(intrinsic, extrinsic, dtype)
+        self.k_num = [float(intrinsic.get(k, 0)) for k in ('k1', 'k2', 'k3')]
+        self.k_den = [float(intrinsic.get(k, 0)) for k in ('k4', 'k5', 'k6')]
+        self.p1 = float(intrinsic.get('p1', 0))
+        self.p2 = float(intrinsic.get('p2', 0))
+
+    def _distort(self, x_n, y_n, r2, x_d, y_d, tmp, tmp2):
+        radial = self._polyval_r2(r2, self.k_num, tmp2)
+        # Denominator goes through x_d, which is overwritten right after
+        den = self._polyval_r2(r2, self.k_den, x_d)
+        radial /= den
+        np.multiply(x_n, radial, out=x_d)
+        np.multiply(y_n, radial, out=y_d)
+        self._add_tangential(x_n, y_n, r2, self.p1, self.p2, x_d, y_d, tmp)
+
+
+class KannalaBrandt(CameraModel):
+    """
+    Kannala-Brandt equidistant fisheye (k1..k4), as in cv2.fisheye:
+    theta_d = theta (1 + k1 theta^2 + k2 theta^4 + k3 theta^6 + k4 theta^8).
+
+    The incidence angle is computed with atan2 so lenses wider than 180 degrees
+    work; points are valid while theta < fov / 2 (intrinsic 'fov', degrees).
+    """
+
+    model = "fisheye"
+
+    def __init__(self, intrinsic, extrinsic, dtype=np.float32):
+        super().__init__(intrinsic, extrinsic, dtype)
+        self.k = [float(intrinsic.get(k, 0)) for k in ('k1', 'k2', 'k3', 'k4')]
+        self.max_theta = np.radians(float(intrinsic.get('fov', 180)) / 2)
+
+    def _project_camera_frame(self, x, y, z, uv, valid):
+        n = len(x)
+        r, theta, theta2, scale, tmp = self._workspace(n, ('r', 'theta', 'theta2', 'scale', 'tmp'))
+
+        np.hypot(x, y, out=r)
+        np.arctan2(r, z, out=theta)
+
+        # Valid: inside the lens FOV and not at the optical centre itself
+        np.less(theta, self.max_theta, out=valid)
+        np.hypot(r, z, out=tmp)
+        valid &= tmp > MIN_DEPTH
+
+        np.multiply(theta, theta, out=theta2)
+        poly = self._polyval_r2(theta2, self.k, scale)
+        poly *= theta  # theta_d
+
+        # scale = theta_d / r, with the r -> 0 limit theta_d / r -> 1 / z
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(poly, r, out=scale)
+            small = r < 1e-9
+            if small.any():
+                scale[small] = 1 / z[small]
+
+        u = uv[:, 0]
+        v = uv[:, 1]
+        with np.errstate(invalid='ignore', over='ignore'):
+            np.multiply(x, scale, out=u)
+            u *= self.fx
+            u += self.cx
+            np.multiply(y, scale, out=v)
+            v *= self.fy
+            v += self.cy
+
+
+MODELS = {
+    "pinhole": PinholeBrown,
+    "rational": Rational,
+    "fisheye": KannalaBrandt,
+}
+
+
+def camera_from_config(camera, dtype=np.float32):
+    """
+    Build a camera model from a config.json camera entry.
+    The model is chosen by intrinsic['model'] (default 'pinhole').
+    """
+    intrinsic = camera['intrinsic']
+    model = intrinsic.get('model', 'pinhole')
+    try:
+        cls = MODELS[model]
+    except KeyError:
+        raise ValueError(f"Unknown camera model: {model}")
+    return cls(intrinsic, camera['extrinsic'], dtype)
+
+
+def project_rig(points, models, cull=True, subsets=None):
+    """
+    Project points into several cameras.
+
+    All extrinsics are applied with a single stacked (C, 3, 3) matmul; each
+    camera's model then projects its slice of the result. With `subsets`
+    (one index array into points per model, e.g. the points a camera can
+    see), camera c only projects points[subsets[c]]; the subsets are padded
+    to a common length so one matmul still covers every camera.
+
+    Returns a list of (uv, depth, valid) tuples, one per model (per subset
+    entry with `subsets`).
+    """
+    if len(models) == 0:
+        return []
+    dtype = models[0].dtype
+    points = np.asarray(points, dtype=dtype)
+    Rt = np.stack([m.Rt for m in models])
+    t = np.stack([m.t for m in models])
+
+    if subsets is None:
+        cam = points[None, :, :] @ Rt
+        lengths = [len(points)] * len(models)
+    else:
+        lengths = [len(s) for s in subsets]
+        gathered = np.zeros((len(models), max(lengths), 3), dtype=dtype)
+        for c, s in enumerate(subsets):
+            np.take(points, s, axis=0, out=gathered[c, :len(s)])
+        cam = gathered @ Rt
+    cam += t[:, None, :]
+    return [m.project_camera_frame(cam[c, :n], cull=cull) for c, (m, n) in enumerate(zip(models, lengths))]
@@ -1,46 +1,250 @@
+"""
+Dataset validator: checks every sensor file of every frame in every scene
+and writes data/<scene>/validation.json, which the server uses to hide
+frames that would fail (see hidden_frames).
+
+Per frame, each sensor directory of the scene (port_* and lidar_os2_pcd)
+must have a file. PCDs are checked from the header and file size alone
+(header parses, WIDTH * HEIGHT == POINTS, the binary or compressed payload
+is all there), JPEGs by their start and end markers; --deep also decodes
+every image and counts ASCII PCD rows. Files are checked in a process pool
+and results are kept per file with its size and mtime, so a rerun only
+checks new or changed files. Gaps in the frame numbering are reported too.
+
+Usage:
+    python check_gaps.py [scene ...] [--data-root data] [--workers N] [--deep]
+"""
+import argparse
+import json
 import os
-import glob
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pcd_loader import read_pcd_header, pcd_dtype
+from scene_manifest import ManifestIndex, build_manifest, LIDAR_DIR
 
 DATA_ROOT = "data"
+REPORT_NAME = "validation.json"
+REPORT_VERSION = 1
+# An EOI marker must be within this many bytes of the end of a JPEG (some
+# encoders pad after it)
+JPEG_TAIL = 1024
 
-def check_scene(scene_name):
-    port1_dir = os.path.join(DATA_ROOT, scene_name, "paired", "port_1")
-    if not os.path.exists(port1_dir):
-        return "No port_1 dir"
-    
-    files = glob.glob(os.path.join(port1_dir, "*.jpg"))
-    if not files:
-        return "No images"
-        
-    frame_nums = []
-    for f in files:
-        try:
-            name = os.path.basename(f).replace(".jpg", "")
-            frame_nums.append(int(name))
-        except:
-            pass
-            
-    frame_nums.sort()
-    
-    if not frame_nums:
-        return "No valid numbered frames"
-        
+
+def find_gaps(frames):
+    """
+    Missing runs [(first, last)] in the numbering of numeric frame names.
+    """
+    frame_nums = sorted(int(f) for f in frames if f.isdigit())
     gaps = []
-    expected = frame_nums[0]
-    for num in frame_nums:
-        if num != expected:
-            gaps.append((expected, num - 1))
-            expected = num
-        expected += 1
-        
+    for prev, num in zip(frame_nums, frame_nums[1:]):
+        if num != prev + 1:
+            gaps.append((prev + 1, num - 1))
     return gaps
 
-print("Checking scenes for gaps...")
-scenes = [d for d in os.listdir(DATA_ROOT) if os.path.isdir(os.path.join(DATA_ROOT, d))]
-for scene in scenes:
-    if os.path.exists(os.path.join(DATA_ROOT, scene, "paired")):
-        gaps = check_scene(scene)
-        if gaps:
-            print(f"Scene {scene}: GAPS FOUND -> {gaps}")
+
+def check_pcd(path, deep=False):
+    """
+    Problems of a PCD file, from its header and size (and rows, if deep).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        try:
+            header = read_pcd_header(f)
+            dt = pcd_dtype(header)
+        except (ValueError, KeyError, IndexError, UnicodeDecodeError) as e:
+            return [f"bad header: {e}"]
+        n = header['points']
+        problems = []
+        if header['width'] * header['height'] != n:
+            problems.append(f"WIDTH * HEIGHT != POINTS ({header['width']} * {header['height']} != {n})")
+        if n == 0:
+            problems.append("no points")
+
+        data = header['data']
+        if data == 'binary':
+            expected = header['data_offset'] + n * dt.itemsize
+            if size < expected:
+                problems.append(f"truncated: {size} of {expected} bytes")
+        elif data == 'binary_compressed':
+            sizes = f.read(8)
+            if len(sizes) < 8:
+                problems.append("truncated: no compressed payload")
+            else:
+                compressed, uncompressed = struct.unpack('<II', sizes)
+                if uncompressed != n * dt.itemsize:
+                    problems.append(f"payload is {uncompressed} bytes, POINTS needs {n * dt.itemsize}")
+                if size < header['data_offset'] + 8 + compressed:
+                    problems.append(f"truncated: {size} of {header['data_offset'] + 8 + compressed} bytes")
+        elif data == 'ascii':
+            if deep:
+                rows = sum(1 for line in f if line.strip())
+                if rows < n:
+                    problems.append(f"truncated: {rows} of {n} rows")
+            elif n and size <= header['data_offset']:
+                problems.append("truncated: no rows")
         else:
-            print(f"Scene {scene}: OK")
+            problems.append(f"unsupported DATA {data}")
+    return problems
+
+
+def check_jpeg(path, deep=False):
+    """
+    Problems of a JPEG file, from its markers (and a full decode, if deep).
+    """
+    size = os.path.getsize(path)
+    if size < 4:
+        return ["empty"]
+    with open(path, 'rb') as f:
+        head = f.read(2)
+        f.seek(max(0, size - JPEG_TAIL))
+        tail = f.read()
+    if head != b'\xff\xd8':
+        return ["not a JPEG"]
+    if b'\xff\xd9' not in tail:
+        return ["truncated: no end marker"]
+    if deep:
+        import cv2
+        if cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8) is None:
+            return ["does not decode"]
+    return []
+
+
+def check_file(sensor, path, deep=False):
+    check = check_pcd if sensor == LIDAR_DIR else check_jpeg
+    try:
+        return check(path, deep)
+    except OSError as e:
+        return [f"unreadable: {e}"]
+
+
+def read_report(scene_dir):
+    """
+    The scene's validation report, or None if there is none (or it is from
+    another REPORT_VERSION).
+    """
+    try:
+        with open(os.path.join(scene_dir, REPORT_NAME), 'r') as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return report if report.get("version") == REPORT_VERSION else None
+
+
+def _write_report(scene_dir, report):
+    path = os.path.join(scene_dir, REPORT_NAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp, path)
+
+
+def validate_scene(scene, scene_dir, pool, deep=False):
+    """
+    Check a scene (reusing unchanged results of its last report) and write
+    its report. Returns (report, number of files checked). Report:
+        {"version", "time", "sensors", "frames", "gaps": [[first, last]],
+         "files": {"<sensor>/<frame>": [size, mtime_ns, deep, [problems]]},
+         "bad_frames": {frame: [{"sensor", "problem", "size", "mtime_ns"}]}}
+    """
+    # A fresh scan rather than the cached manifest: a file rewritten in place
+    # does not change its directory's mtime
+    manifest = build_manifest(scene, os.path.join(scene_dir, "paired"))
+    previous = (read_report(scene_dir) or {}).get("files", {})
+
+    files = {}
+    todo = []
+    for sensor in manifest.sensors:
+        for frame in manifest.frames_with(sensor):
+            key = f"{sensor}/{frame}"
+            size, mtime = manifest.file_size(sensor, frame), manifest.file_mtime(sensor, frame)
+            prev = previous.get(key)
+            if prev and prev[0] == size and prev[1] == mtime and (prev[2] or not deep):
+                files[key] = prev
+            else:
+                todo.append((key, sensor, manifest.file_path(sensor, frame), size, mtime))
+
+    if todo:
+        keys, sensors, paths, sizes, mtimes = zip(*todo)
+        results = pool.map(check_file, sensors, paths, [deep] * len(todo), chunksize=max(1, len(todo) // 256))
+        for key, size, mtime, problems in zip(keys, sizes, mtimes, results):
+            files[key] = [size, mtime, deep, problems]
+
+    bad_frames = {}
+    for frame in manifest.frames:
+        problems = []
+        for sensor in manifest.sensors:
+            entry = files.get(f"{sensor}/{frame}")
+            if entry is None:
+                problems.append({"sensor": sensor, "problem": "missing", "size": None, "mtime_ns": None})
+            else:
+                problems.extend({"sensor": sensor, "problem": p, "size": entry[0], "mtime_ns": entry[1]}
+                                for p in entry[3])
+        if problems:
+            bad_frames[frame] = problems
+
+    report = {
+        "version": REPORT_VERSION, "time": time.time(), "sensors": manifest.sensors,
+        "frames": len(manifest.frames), "gaps": find_gaps(manifest.frames),
+        "files": files, "bad_frames": bad_frames,
+    }
+    _write_report(scene_dir, report)
+    return report, len(todo)
+
+
+def hidden_frames(report, manifest):
+    """
+    Frames of the report's bad_frames whose problems still apply to the files
+    the manifest lists now (a file replaced since the check is given the
+    benefit of the doubt until the next run).
+    """
+    hidden = set()
+    for frame, problems in (report or {}).get("bad_frames", {}).items():
+        for p in problems:
+            sensor = p["sensor"]
+            if p["problem"] == "missing":
+                still = not manifest.has(sensor, frame)
+            else:
+                still = (manifest.file_size(sensor, frame) == p["size"]
+                         and manifest.file_mtime(sensor, frame) == p["mtime_ns"])
+            if still:
+                hidden.add(frame)
+                break
+    return hidden
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every sensor file of every frame")
+    parser.add_argument("scenes", nargs="*", help="scene names (default: all)")
+    parser.add_argument("--data-root", default=DATA_ROOT)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--deep", action="store_true", help="also decode images and count ASCII PCD rows")
+    args = parser.parse_args()
+
+    manifests = ManifestIndex(args.data_root)
+    print("Checking scenes...")
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count() or 1) as pool:
+        for scene in args.scenes or manifests.scenes():
+            scene_dir = os.path.join(args.data_root, scene)
+            if not os.path.isdir(os.path.join(scene_dir, "paired")):
+                print(f"Scene {scene}: no paired/ directory")
+                continue
+            start = time.perf_counter()
+            report, checked = validate_scene(scene, scene_dir, pool, args.deep)
+            bad = report["bad_frames"]
+            status = "OK" if not bad and not report["gaps"] else ""
+            if report["gaps"]:
+                status += f"GAPS FOUND -> {report['gaps']} "
+            if bad:
+                status += f"{len(bad)} of {report['frames']} frames bad"
+            print(f"Scene {scene}: {status.strip()} ({checked} files checked, "
+                  f"{time.perf_counter() - start:.1f} s)")
+            for frame in list(bad)[:10]:
+                print(f"    {frame}: " + "; ".join(f"{p['sensor']} {p['problem']}" for p in bad[frame]))
+            if len(bad) > 10:
+                print(f"    ... see {os.path.join(scene_dir, REPORT_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from camera_models import camera_from_config
+from check_gaps import read_report, hidden_frames
+from scene_manifest import ManifestIndex
+
+
+def flatten(value, prefix=""):
+    """
+    {dotted key: leaf value} of nested dicts, e.g. {"cameras.port_1.extrinsic.yaw": 1.5}.
+    """
+    if not isinstance(value, dict) or not value:
+        return {prefix: value} if prefix else {}
+    out = {}
+    for key, child in value.items():
+        out.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    return out
+
+
+def diff_config(old, new):
+    """
+    Changed leaves as {dotted key: [old, new]}; a missing side is None.
+    """
+    a, b = flatten(old), flatten(new)
+    return {k: [a.get(k), b.get(k)] for k in sorted(a.keys() | b.keys()) if a.get(k) != b.get(k)}
+
+
+def merge_patch(target, patch):
+    """
+    JSON merge patch (RFC 7396): dicts merge recursively, None deletes a key.
+    Returns a new object; `target` is not modified.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def content_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def read_cameras(config_path, scene_dir):
+    """
+    Cameras a scene is calibrated with, for offline tools: the global config
+    if it exists, else the scene's own paired/config.json (the server's
+    fallback too). {} if there is neither.
+    """
+    for path in (config_path, os.path.join(scene_dir, "paired", "config.json")):
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f).get("cameras", {})
+    return {}
+
+
+def export_inputs(data_root, scene, config_path, ports, sensor):
+    """
+    (manifest, {port: camera}, frames) for the offline exporters: the cameras
+    read_cameras finds, limited to `ports` (comma-separated, None for all),
+    and the frames with a `sensor` file that the scene's validation report
+    does not hide. Raises ValueError with a message for the command line.
+    """
+    scene_dir = os.path.join(data_root, scene)
+    manifest = ManifestIndex(data_root).get(scene)
+    if manifest is None:
+        raise ValueError(f"Unknown scene: {scene}")
+    cameras = read_cameras(config_path, scene_dir)
+    if ports:
+        missing = [p for p in ports.split(",") if p not in cameras]
+        if missing:
+            raise ValueError(f"Not in the config: {', '.join(missing)}")
+        cameras = {p: cameras[p] for p in ports.split(",")}
+    if not cameras:
+        raise ValueError("No cameras in the config")
+    hidden = hidden_frames(read_report(scene_dir), manifest)
+    return manifest, cameras, [f for f in manifest.frames_with(sensor) if f not in hidden]
+
+
+# Per exporter worker process: set once by init_export_worker
+export_worker = {}
+
+
+def init_export_worker(cameras, state):
+    # Pool initializer: the `state` dict plus the camera models, models[i] being those of ports[i]
+    export_worker.update(state, ports=list(cameras), models=[camera_from_config(c) for c in cameras.values()])
+
+
+def changed_ports(changes):
+    # Cameras touched by a diff_config result
+    return sorted({key.split(".")[1] for key in changes if key.startswith("cameras.") and key.count(".") >= 1})
+
+
+class ConfigConflict(Exception):
+    """
+    A write was based on a version older than the last change to a camera it touches.
+    """
+
+    def __init__(self, ports, version):
+        super().__init__(f"Changed since version {version}: {', '.join(ports)}")
+        self.ports = ports
+        self.version = version
+
+
+class ConfigStore:
+    """
+    config.json with a version number that increases on every change.
+
+    Writes go to a temporary file that is renamed over the config, so a crash
+    never leaves a half-written file. Every change is appended to a JSON-lines
+    history next to it ({version, time, source, ports, changes, hash}), from
+    which the version and the version at which each camera last changed
+    (camera_versions) are recovered on startup. Edits made to the file by hand
+    are noticed (by mtime and size while running, by content hash across
+    restarts) and recorded as source "external".
+
+    A write may pass base_version, the version its author last read; it is
+    rejected with ConfigConflict only if a camera it changes has changed since,
+    so people editing different cameras do not get in each other's way.
+    """
+
+    def __init__(self, path, history_path=None):
+        self.path = path
+        self.history_path = history_path or f"{path}.history.jsonl"
+        self._lock = threading.Lock()
+        self._config = None
+        self._stat = None
+        self.version = 0
+        self.camera_versions = {}
+        self._last_hash = None
+        self._read_history()
+
+    def _read_history(self):
+        if not os.path.exists(self.history_path):
+            return
+        with open(self.history_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append
+                    continue
+                self.version = max(self.version, entry["version"])
+                self._last_hash = entry.get("hash", self._last_hash)
+                for port in entry.get("ports", []):
+                    self.camera_versions[port] = entry["version"]
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        # Reload if the file changed behind our back
+        stat = self._file_stat()
+        if stat == self._stat and self._config is not None:
+            return
+        config = {}
+        if stat is not None:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+        if self._config is not None:
+            if config != self._config:
+                self._record(config, diff_config(self._config, config), "external")
+        elif self._last_hash is not None and content_hash(config) != self._last_hash:
+            # Edited while the server was down; which cameras changed is unknown
+            self._record(config, {}, "external", ports=sorted(config.get("cameras", {})))
+        self._config = config
+        self._stat = stat
+
+    def snapshot(self):
+        """
+        (config, version, camera_versions); the config is a copy the caller may modify.
+        """
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._config), self.version, dict(self.camera_versions)
+
+    def get(self):
+        return self.snapshot()[0]
+
+    def replace(self, config, base_version=None, source="replace", seed=None):
+        """
+        Store a whole new config. Returns the new version (unchanged if the
+        config is identical). `seed` stands in for a config file that does
+        not exist yet, so the first write records only what it changes.
+        """
+        with self._lock:
+            self._refresh()
+            current = self._config if self._stat is not None or seed is None else seed
+            return self._write(config, diff_config(current, config), base_version, source)
+
+    def patch_camera(self, port, patch, base_version=None, source="patch", seed=None):
+        """
+        Merge `patch` (JSON merge patch) into one camera's entry.
+        Returns (camera, new version). KeyError if there is no such camera.
+        """
+        with self._lock:
+            self._refresh()
+            current = self._config if self._stat is not None or seed is None else seed
+            if port not in current.get("cameras", {}):
+                raise KeyError(port)
+            config = copy.deepcopy(current)
+            config["cameras"][port] = merge_patch(current["cameras"][port], patch)
+            version = self._write(config, diff_config(current, config), base_version, source)
+            return copy.deepcopy(config["cameras"][port]), version
+
+    def _write(self, config, changes, base_version, source):
+        if not changes:
+            return self.version
+        if base_version is not None:
+            stale = [p for p in changed_ports(changes) if self.camera_versions.get(p, 0) > base_version]
+            if stale:
+                raise ConfigConflict(stale, base_version)
+
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._config = copy.deepcopy(config)
+        self._stat = self._file_stat()
+        self._record(config, changes, source)
+        return self.version
+
+    def _record(self, config, changes, source, ports=None):
+        self.version += 1
+        ports = changed_ports(changes) if ports is None else ports
+        for port in ports:
+            self.camera_versions[port] = self.version
+        self._last_hash = content_hash(config)
+        entry = {"version": self.version, "time": time.time(), "source": source, "ports": ports,
+                 "changes": changes, "hash": self._last_hash}
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def history(self, since=0, limit=100):
+        """
+        History entries with version > since, oldest first, at most `limit`.
+        """
+        entries = []
+        if os.path.exists(self.history_path):
+            with open(self.history_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry["version"] > since:
+                        entries.append(entry)
+        return entries[:limit]
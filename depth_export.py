@@ -0,0 +1,271 @@
+"""
+Sparse per-camera depth maps for training depth completion: every frame's
+LiDAR points projected into each camera with the saved config, one image per
+port and frame.
+
+Where several points land on one pixel the nearest wins (a z-buffer done with
+one lexsort, no per-point loop). Depth is the camera-frame z in metres, 0
+where no point landed. --format png writes 16-bit PNGs of depth * DEPTH_SCALE
+(the KITTI convention; depths beyond MAX_DEPTH are left out), npy writes
+float32 arrays.
+
+Frames are rendered in a process pool and written to
+OUT/<scene>/<port>/<frame>.png|.npy. Each port directory keeps an
+index.<format>.json with the camera the maps were rendered with and, per
+frame, the size and mtime of the PCD its map was made from. A rerun only
+redoes maps whose PCD is not exactly that file any more (a replacement with
+an older mtime counts too) and cameras whose config changed.
+Frames hidden by the scene's validation report (see check_gaps.py) are
+skipped. The server serves the same maps at /api/depth/{port}/{frame}.
+
+Usage:
+    python depth_export.py SCENE [--data-root data] [--config config.json]
+                           [--out depth] [--format png|npy] [--ports port_1,port_2]
+                           [--workers N] [--force]
+"""
+import argparse
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from calibration_utils import project_points_multi
+from config_store import content_hash, export_inputs, export_worker, init_export_worker
+from pcd_loader import load_pcd
+from preprocess import columnar_path, read_pts_header, read_pts, is_current
+from scene_manifest import LIDAR_DIR
+
+DEPTH_FORMATS = ("png", "npy")
+# uint16 PNG value per metre: 1/256 m steps up to MAX_DEPTH
+DEPTH_SCALE = 256.0
+MAX_DEPTH = 65535 / DEPTH_SCALE
+
+
+def index_path(out_dir, port, fmt):
+    # Per format, so png and npy maps can share a port directory
+    return os.path.join(out_dir, port, f"index.{fmt}.json")
+
+
+def sparse_depth(uv, depth, width, height):
+    """
+    (height, width) float32 depth map of projected points (uv in pixels),
+    keeping the nearest point per pixel; 0 where there is none.
+    """
+    u = np.floor(uv[:, 0]).astype(np.intp)
+    v = np.floor(uv[:, 1]).astype(np.intp)
+    inside = (u >= 0) & (u < width) & (v >= 0) & (v < height)
+    pixel = v[inside] * width + u[inside]
+    d = np.asarray(depth, dtype=np.float32)[inside]
+    # By pixel, then by depth: the first entry of each pixel's run is the nearest
+    order = np.lexsort((d, pixel))
+    pixel = pixel[order]
+    d = d[order]
+    first = np.ones(len(pixel), dtype=bool)
+    first[1:] = pixel[1:] != pixel[:-1]
+    out = np.zeros(height * width, dtype=np.float32)
+    out[pixel[first]] = d[first]
+    return out.reshape(height, width)
+
+
+def encode_depth(depth, fmt):
+    """
+    File contents of a depth map: 16-bit PNG (depth * DEPTH_SCALE) or .npy.
+    """
+    if fmt == "npy":
+        buf = io.BytesIO()
+        np.save(buf, depth)
+        return buf.getvalue()
+    import cv2
+    scaled = np.rint(depth * DEPTH_SCALE)
+    scaled[scaled > 65535] = 0
+    ok, encoded = cv2.imencode('.png', scaled.astype(np.uint16))
+    if not ok:
+        raise ValueError("Could not encode depth map")
+    return encoded.tobytes()
+
+
+def depth_maps(points, models):
+    # One depth map per camera model
+    projections = project_points_multi(points, models)
+    return [sparse_depth(p['uv'], p['depth'], m.width, m.height) for p, m in zip(projections, models)]
+
+
+def depth_path(out_dir, port, frame, fmt):
+    return os.path.join(out_dir, port, f"{frame}.{fmt}")
+
+
+def load_points(pcd_path, pts_path):
+    """
+    All finite points of a frame, from its .pts file (see preprocess.py) if
+    that is current, else from the PCD.
+    """
+    try:
+        st = os.stat(pcd_path)
+        header = read_pts_header(pts_path)
+        if is_current(header, st.st_size, st.st_mtime_ns):
+            return read_pts(pts_path, header, ("xyz",))[1]["xyz"].astype(np.float32)
+    except (OSError, ValueError):
+        pass
+    points = np.asarray(load_pcd(pcd_path), dtype=np.float32)
+    return points[np.isfinite(points).all(axis=1)]
+
+
+def export_frame(pcd_path, pts_path, outputs):
+    """
+    Write the depth maps of one frame for {port: output path}. Returns the
+    [size, mtime_ns] of the PCD they were made from.
+    """
+    # Before reading: if the PCD changes meanwhile, the next run redoes the maps
+    st = os.stat(pcd_path)
+    points = load_points(pcd_path, pts_path)
+    models = dict(zip(export_worker["ports"], export_worker["models"]))
+    ports = list(outputs)
+    maps = depth_maps(points, [models[p] for p in ports])
+    for port, depth in zip(ports, maps):
+        path = outputs[port]
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(encode_depth(depth, export_worker["fmt"]))
+        os.replace(tmp, path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _written(port_dir, fmt):
+    # Frames that have a map in a port directory
+    ext = f".{fmt}"
+    try:
+        with os.scandir(port_dir) as it:
+            return {e.name[:-len(ext)] for e in it if e.name.endswith(ext)}
+    except FileNotFoundError:
+        return set()
+
+
+def _meta(camera, fmt):
+    return {"camera": content_hash(camera), "format": fmt, "scale": DEPTH_SCALE}
+
+
+def read_sources(out_dir, port, camera, fmt):
+    """
+    {frame: [PCD size, mtime_ns]} of a port's maps, or {} if they were
+    rendered with another camera config (or there is no index).
+    """
+    try:
+        with open(index_path(out_dir, port, fmt), 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    sources = index.pop("sources", None)
+    if index != _meta(camera, fmt) or not isinstance(sources, dict):
+        return {}
+    return sources
+
+
+def write_sources(out_dir, port, camera, fmt, sources):
+    path = index_path(out_dir, port, fmt)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({**_meta(camera, fmt), "sources": sources}, f)
+    os.replace(tmp, path)
+
+
+def pending_frames(manifest, frames, out_dir, cameras, fmt, force=False):
+    """
+    ([(frame, pcd path, {port: output path})] of the maps that are missing,
+    made from another PCD file or with another camera config, {port: {frame:
+    [PCD size, mtime_ns]}} of the maps that are current).
+    """
+    recorded = {}
+    for port, camera in cameras.items():
+        written = _written(os.path.join(out_dir, port), fmt)
+        sources = {} if force else read_sources(out_dir, port, camera, fmt)
+        recorded[port] = {frame: src for frame, src in sources.items() if frame in written}
+
+    todo = []
+    current = {port: {} for port in cameras}
+    for frame in frames:
+        pcd_path = manifest.file_path(LIDAR_DIR, frame)
+        # Stat the PCD itself: the manifest misses files rewritten in place
+        st = os.stat(pcd_path)
+        source = [st.st_size, st.st_mtime_ns]
+        outputs = {}
+        for port in cameras:
+            if recorded[port].get(frame) == source:
+                current[port][frame] = source
+            else:
+                outputs[port] = depth_path(out_dir, port, frame, fmt)
+        if outputs:
+            todo.append((frame, pcd_path, outputs))
+    return todo, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sparse per-camera depth maps of a scene")
+    parser.add_argument("scene")
+    parser.add_argument("--data-root", default="data")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--out", default="depth", help="maps go to OUT/<scene>/<port>/<frame>.<format>")
+    parser.add_argument("--format", choices=DEPTH_FORMATS, default="png")
+    parser.add_argument("--ports", default=None, help="comma-separated (default: every camera in the config)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--force", action="store_true", help="redo maps that are up to date")
+    args = parser.parse_args()
+
+    try:
+        manifest, cameras, frames = export_inputs(args.data_root, args.scene, args.config, args.ports, LIDAR_DIR)
+    except ValueError as e:
+        parser.error(str(e))
+    out_dir = os.path.join(args.out, args.scene)
+    todo, sources = pending_frames(manifest, frames, out_dir, cameras, args.format, args.force)
+
+    def save_sources():
+        for port, camera in cameras.items():
+            write_sources(out_dir, port, camera, args.format, sources[port])
+
+    # Maps about to be redone lose their record first, so an interrupted run
+    # never leaves an outdated map looking current, and their files, so a
+    # frame that fails leaves no map made with the old camera or PCD
+    for port in cameras:
+        os.makedirs(os.path.join(out_dir, port), exist_ok=True)
+    save_sources()
+    for _, _, outputs in todo:
+        for path in outputs.values():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    start = time.perf_counter()
+    failed = 0
+    maps = 0
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count() or 1, initializer=init_export_worker,
+                             initargs=(cameras, {"fmt": args.format})) as pool:
+        futures = {pool.submit(export_frame, pcd, columnar_path(args.data_root, args.scene, frame), outputs):
+                   (frame, outputs) for frame, pcd, outputs in todo}
+        for done, fut in enumerate(as_completed(futures), 1):
+            frame, outputs = futures[fut]
+            try:
+                source = fut.result()
+                maps += len(outputs)
+                for port in outputs:
+                    sources[port][frame] = source
+            except (OSError, ValueError) as e:
+                failed += 1
+                print(f"{args.scene}/{frame}: {e}")
+            if done % 100 == 0:
+                print(f"{done}/{len(todo)} frames")
+                save_sources()
+
+    # Failed frames have neither a map nor a record, so the next run retries them
+    save_sources()
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.scene}: {len(todo) - failed} frames exported ({maps} maps), "
+          f"{len(frames) - len(todo)} up to date, {failed} failed, {elapsed:.1f} s"
+          + (f" ({maps / elapsed:.1f} maps/s)" if todo and elapsed > 0 else "") + f" -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
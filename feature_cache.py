@@ -0,0 +1,138 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from image_cache import ImageCache
+from point_cache import PointCache
+
+# Distance maps are computed from images decoded at half resolution;
+# plenty for edge alignment
+FEATURE_SCALE = 0.5
+# Maps are stored as uint8 fixed point, DIST_STEP map pixels per unit, so
+# distances clip at 63.75 map pixels (127.5 full-resolution pixels)
+DIST_STEP = 0.25
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+
+def image_edge_distance(gray, low=CANNY_LOW, high=CANNY_HIGH):
+    """
+    Distance (pixels of `gray`) from each pixel to the nearest Canny edge.
+    """
+    import cv2
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, low, high)
+    return cv2.distanceTransform(255 - edges, cv2.DIST_L2, 3)
+
+
+def edge_distance_map(image_path):
+    """
+    Edge distance map of an image at FEATURE_SCALE, as uint8 fixed point
+    (multiply by DIST_STEP for map pixels).
+    """
+    import cv2
+    gray = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    if gray is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    # An image without edges comes back as FLT_MAX everywhere
+    dist = np.minimum(image_edge_distance(gray), 255 * DIST_STEP)
+    return np.rint(dist / DIST_STEP).astype(np.uint8)
+
+
+def _render_distance(src_path, dst_path):
+    dist = edge_distance_map(src_path)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp = f"{dst_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        np.save(f, dist)
+    os.replace(tmp, dst_path)
+    return os.path.getsize(dst_path)
+
+
+class FeatureCache:
+    """
+    Per-image edge distance maps (see edge_distance_map), computed on a worker
+    pool, persisted as .npy files under `root` within a byte budget and kept
+    decoded in memory within another, so scoring a config against a frame
+    never touches the JPEGs once the maps exist.
+    """
+
+    def __init__(self, root, max_bytes, memory_bytes, workers=None):
+        workers = workers or min(8, os.cpu_count() or 1)
+        self.files = ImageCache(root, max_bytes, workers, render=_render_distance)
+        self.memory = PointCache(memory_bytes)
+        # Fans a batch out so its misses render in parallel
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="features")
+
+    def path(self, scene, port, frame, etag):
+        # etag from image_cache.image_etag: a rewritten image never maps to a stale map
+        tag = etag.strip('"')[:8]
+        return os.path.join(self.files.root, scene, port, f"{frame}_{tag}.npy")
+
+    def get(self, src_path, dst_path):
+        """
+        Edge distance map of the image at src_path, rendered to dst_path if needed.
+        """
+        dist = self.memory.get(dst_path)
+        if dist is None:
+            dist = self.memory.put(dst_path, np.load(self.files.get(src_path, dst_path)))
+        return dist
+
+    def get_many(self, items):
+        """
+        Maps for [(src_path, dst_path)], computed in parallel; a failed image
+        yields None instead of its map.
+        """
+        def load(item):
+            try:
+                return self.get(*item)
+            except (OSError, ValueError):
+                return None
+        return list(self._executor.map(load, items))
+
+    def stats(self):
+        return {"files": self.files.stats(), "memory": self.memory.stats()}
+
+
+def main():
+    """
+    Precompute the maps of every camera image of a scene (or all scenes).
+    """
+    import argparse
+    import time
+
+    from image_cache import image_etag
+    from scene_manifest import ManifestIndex
+
+    parser = argparse.ArgumentParser(description="Precompute edge distance maps")
+    parser.add_argument("scenes", nargs="*", help="scene names (default: all)")
+    parser.add_argument("--data-root", default="data")
+    parser.add_argument("--cache-root", default=os.environ.get("CACHE_ROOT", ".cache"))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    cache = FeatureCache(os.path.join(args.cache_root, "features"), 1 << 62, 0, args.workers)
+    manifests = ManifestIndex(args.data_root)
+    for scene in args.scenes or manifests.scenes():
+        manifest = manifests.get(scene)
+        if manifest is None:
+            print(f"Unknown scene: {scene}")
+            continue
+        items = []
+        for port in manifest.sensors:
+            if not port.startswith("port_"):
+                continue
+            for frame in manifest.frames_with(port):
+                # Stat the image itself, as the server does
+                path = manifest.file_path(port, frame)
+                st = os.stat(path)
+                items.append((path, cache.path(scene, port, frame, image_etag(st.st_size, st.st_mtime_ns))))
+        start = time.perf_counter()
+        failed = sum(dist is None for dist in cache.get_many(items))
+        print(f"{scene}: {len(items)} images, {failed} failed, {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
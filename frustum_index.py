@@ -0,0 +1,96 @@
+"""
+Azimuth sector index of a frame's points, so each camera only touches the
+points it can possibly see.
+
+The LiDAR sweep is split into SECTORS equal wedges around the vertical axis;
+points within NEAR_RANGE of the sensor go to one extra bucket that every
+camera includes (seen from a camera a few decimetres away, their azimuth is
+unreliable). A camera's wedges come from projecting sample rays through its
+own model (so any lens and distortion works) and are widened by one wedge on
+each side. With six cameras around a 360 degree sweep, each selects roughly
+a quarter of the points.
+
+The index depends only on the frame; a camera's wedges depend only on that
+camera, so a pose change re-selects one camera and nothing else.
+"""
+import numpy as np
+
+SECTORS = 64
+# Metres; closer points are kept for every camera
+NEAR_RANGE = 3.0
+# Sample rays testing which wedges a camera sees: per-wedge azimuths,
+# elevations (degrees) and ranges (metres), the latter for the camera offset
+SAMPLE_AZIMUTHS = 4
+SAMPLE_ELEVATIONS = np.linspace(-60, 60, 9)
+SAMPLE_RANGES = (NEAR_RANGE, 6.0, 12.0, 25.0, 50.0, 100.0)
+
+
+def point_sectors(points):
+    """
+    Sector of each point (0..SECTORS-1, or SECTORS for the near bucket) as uint8.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    x, y = points[:, 0], points[:, 1]
+    az = np.arctan2(y, x)
+    sector = ((az + np.pi) * (SECTORS / (2 * np.pi))).astype(np.int64)
+    np.minimum(sector, SECTORS - 1, out=sector)
+    sector[x * x + y * y < NEAR_RANGE * NEAR_RANGE] = SECTORS
+    return sector.astype(np.uint8)
+
+
+def _sample_points():
+    az = (np.arange(SECTORS * SAMPLE_AZIMUTHS) + 0.5) * (2 * np.pi / (SECTORS * SAMPLE_AZIMUTHS)) - np.pi
+    el = np.radians(SAMPLE_ELEVATIONS)
+    a, e, r = np.meshgrid(az, el, SAMPLE_RANGES, indexing='ij')
+    pts = np.stack([r * np.cos(e) * np.cos(a), r * np.cos(e) * np.sin(a), r * np.sin(e)], -1)
+    # Rows grouped by sector: SAMPLE_AZIMUTHS * elevations * ranges each
+    return pts.reshape(-1, 3).astype(np.float32)
+
+
+_SAMPLES = _sample_points()
+
+
+def camera_sectors(model):
+    """
+    (SECTORS + 1,) bool mask of the wedges a camera_models.CameraModel can
+    see, widened by one wedge each side; the near bucket is always set.
+    """
+    _, _, valid = model.project(_SAMPLES)
+    seen = valid.reshape(SECTORS, -1).any(axis=1)
+    seen = seen | np.roll(seen, 1) | np.roll(seen, -1)
+    return np.append(seen, True)
+
+
+class SectorIndex:
+    """
+    Point indices of a frame grouped by sector, each group in the original
+    (LOD) order, so a camera's points within any LOD prefix are one
+    searchsorted per wedge.
+    """
+
+    def __init__(self, points):
+        sectors = point_sectors(points)
+        self.order = np.argsort(sectors, kind='stable').astype(np.uint32)
+        self.bounds = np.searchsorted(sectors[self.order], np.arange(SECTORS + 2))
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.bounds.nbytes
+
+    def select(self, mask, end=None, start=0):
+        """
+        Sorted indices in [start, end) of the points in the sectors set in `mask`.
+        """
+        parts = []
+        for s in np.flatnonzero(mask):
+            group = self.order[self.bounds[s]:self.bounds[s + 1]]
+            if end is not None:
+                group = group[:np.searchsorted(group, end)]
+            if start:
+                group = group[np.searchsorted(group, start):]
+            parts.append(group)
+        if not parts:
+            return np.zeros(0, dtype=np.uint32)
+        index = np.concatenate(parts)
+        index.sort()
+        return index
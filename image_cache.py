@@ -0,0 +1,228 @@
+import functools
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Widths served for downscaled requests; a requested size is rounded up to one of these
+IMAGE_SIZES = (320, 480, 640, 960, 1280)
+DEFAULT_QUALITY = 80
+MIN_QUALITY = 30
+MAX_QUALITY = 95
+
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+@functools.lru_cache(maxsize=65536)
+def jpeg_size(path, size, mtime):
+    """
+    (width, height) of a JPEG from its frame header, or None if it cannot be
+    found. `size` and `mtime` (of the file as it is now) key the cache.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':
+                return None
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                (length,) = struct.unpack('>H', marker[2:])
+                if marker[1] in _SOF_MARKERS:
+                    header = f.read(5)
+                    if len(header) < 5:
+                        return None
+                    height, width = struct.unpack('>HH', header[1:])
+                    return width, height
+                # Skip the segment (the length counts its own two bytes)
+                f.seek(length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def snap_size(size, full_width):
+    """
+    Round a requested width up to a pyramid level. None means the original
+    (also for any size at or above the source's `full_width`: no upscaling).
+    """
+    if size is None or size >= full_width:
+        return None
+    for level in IMAGE_SIZES:
+        if size <= level:
+            return level if level < full_width else None
+    return None
+
+
+def clamp_quality(quality):
+    if quality is None:
+        return DEFAULT_QUALITY
+    return max(MIN_QUALITY, min(MAX_QUALITY, int(quality)))
+
+
+def image_etag(src_size, src_mtime, width=None, quality=None):
+    """
+    Strong validator for an image variant: changes whenever the source file
+    or the requested variant changes.
+    """
+    key = f"{src_size}:{src_mtime}:{width}:{quality}".encode('ascii')
+    return '"' + hashlib.sha1(key).hexdigest()[:20] + '"'
+
+
+def _render_variant(src_path, dst_path, width, quality):
+    # JPEG decoders can downscale by 2/4/8 during decode, which is much
+    # cheaper than decoding full resolution and resizing. A 1/8 grayscale
+    # decode tells us the source size for a fraction of the cost.
+    import cv2
+    probe = cv2.imread(src_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if probe is None:
+        raise ValueError(f"Could not read image: {src_path}")
+    w = probe.shape[1] * 8
+
+    img = None
+    for flag, factor in ((cv2.IMREAD_REDUCED_COLOR_8, 8), (cv2.IMREAD_REDUCED_COLOR_4, 4), (cv2.IMREAD_REDUCED_COLOR_2, 2)):
+        if w // factor >= width:
+            img = cv2.imread(src_path, flag)
+            break
+    if img is None:
+        img = cv2.imread(src_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read image: {src_path}")
+
+    # Never upscale, even if the source is narrower than the caller assumed
+    width = min(width, img.shape[1])
+    height = max(1, round(img.shape[0] * width / img.shape[1]))
+    if img.shape[1] != width:
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError(f"Could not encode image: {src_path}")
+
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp = f"{dst_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(encoded.tobytes())
+    os.replace(tmp, dst_path)
+    return os.path.getsize(dst_path)
+
+
+class ImageCache:
+    """
+    On-disk cache of downscaled JPEG variants, generated on demand by a worker
+    pool and evicted least-recently-used when over the byte budget.
+
+    `render(src_path, dst_path, *args)` writes one file and returns its size;
+    other per-image derivatives (see feature_cache) reuse the cache that way.
+
+    Variants left by previous runs are indexed by scan(), which the first
+    get() or stats() runs if nothing called it earlier (walking a large cache
+    on network storage should not hold up startup).
+    """
+
+    def __init__(self, root, max_bytes, workers=None, render=_render_variant):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._render = render
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                            thread_name_prefix="image-render")
+        self._lock = threading.Lock()
+        self._pending = {}  # dst path -> Future
+        self._entries = OrderedDict()  # dst path -> size, oldest first
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan_lock = threading.Lock()
+        self._scanned = False
+
+    def scan(self):
+        # Pick up variants from previous runs, oldest access first
+        if self._scanned:
+            return
+        with self._scan_lock:
+            if not self._scanned:
+                self._scan()
+                self._scanned = True
+
+    def _scan(self):
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith('.tmp'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_atime, path, st.st_size))
+        with self._lock:
+            for _, path, size in sorted(found):
+                self._entries[path] = size
+                self.current_bytes += size
+
+    def variant_path(self, scene, port, frame, width, quality, etag):
+        # The etag is part of the name so a rewritten source never maps to a stale variant
+        tag = etag.strip('"')[:8]
+        return os.path.join(self.root, scene, port, f"{frame}_w{width}_q{quality}_{tag}.jpg")
+
+    def get(self, src_path, dst_path, *args):
+        """
+        Path of the variant, rendering it on the worker pool if needed.
+        Blocks until the file exists. Concurrent requests share one render.
+        """
+        self.scan()
+        with self._lock:
+            if dst_path in self._entries:
+                self._entries.move_to_end(dst_path)
+                self.hits += 1
+                return dst_path
+            fut = self._pending.get(dst_path)
+            if fut is None:
+                self.misses += 1
+                fut = self._executor.submit(self._render, src_path, dst_path, *args)
+                self._pending[dst_path] = fut
+
+        try:
+            size = fut.result()
+        finally:
+            with self._lock:
+                self._pending.pop(dst_path, None)
+
+        with self._lock:
+            if dst_path not in self._entries:
+                self._entries[dst_path] = size
+                self.current_bytes += size
+                self._evict()
+        return dst_path
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        self.scan()
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
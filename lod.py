@@ -0,0 +1,120 @@
+import numpy as np
+
+# Voxel edge lengths (metres) of the successive LOD passes, coarse to fine
+LOD_VOXEL_SIZES = (4.0, 2.0, 1.0, 0.5, 0.25, 0.125, 0.0625)
+# Point counts advertised to clients as discrete levels (the last is full resolution)
+LOD_LEVELS = (20000, 80000)
+
+
+class PointLOD:
+    """
+    A point cloud reordered for progressive level-of-detail delivery.
+
+    Points are sorted so that every prefix is a spatially uniform subsample:
+    the first pass keeps one point per 4 m voxel, the next adds one point per
+    newly occupied 2 m voxel, and so on; whatever is left comes last. Any
+    level, voxel size or target count is therefore a prefix of `points`, and
+    refining from one level to the next only sends the points in between.
+    """
+
+    def __init__(self, points, voxel_sizes, voxel_ends):
+        self.points = points              # (N, 3) float32, progressive order
+        self.voxel_sizes = voxel_sizes    # voxel size of each pass
+        self.voxel_ends = voxel_ends      # prefix length after each pass
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def nbytes(self):
+        return self.points.nbytes
+
+    @property
+    def levels(self):
+        n = len(self.points)
+        return [c for c in LOD_LEVELS if c < n] + [n]
+
+    def prefix_for_voxel(self, voxel):
+        """
+        Number of points needed for at least one point per occupied voxel of
+        the given size (rounded to the nearest coarser pass).
+        """
+        end = 0
+        for size, pass_end in zip(self.voxel_sizes, self.voxel_ends):
+            if size < voxel:
+                break
+            end = pass_end
+        # Finer than the finest pass means full resolution
+        if voxel < self.voxel_sizes[-1]:
+            end = len(self.points)
+        return max(end, min(1, len(self.points)))
+
+    def select(self, start=0, count=None, voxel=None):
+        """
+        Points [start, end) where end comes from `voxel` or `count`
+        (full resolution if neither is given).
+        """
+        n = len(self.points)
+        if voxel is not None:
+            end = self.prefix_for_voxel(voxel)
+        elif count is not None:
+            end = min(count, n)
+        else:
+            end = n
+        start = min(max(start, 0), end)
+        return self.points[start:end]
+
+
+def lod_order(points, voxel_sizes=LOD_VOXEL_SIZES):
+    """
+    (order, voxel_ends): indices into `points` in progressive order (see
+    PointLOD) and the prefix length after each voxel pass. Non-finite points
+    (e.g. sensor no-returns stored as NaN) are left out of `order`, so other
+    per-point columns can be reordered the same way.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    finite = np.isfinite(points).all(axis=1)
+    index = None
+    if not finite.all():
+        index = np.flatnonzero(finite)
+        points = points[finite]
+
+    n = len(points)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp), [0] * len(voxel_sizes)
+
+    lo = points.min(axis=0)
+    remaining = np.arange(n)
+    chosen_parts = []
+    voxel_ends = []
+    taken = 0
+
+    for size in voxel_sizes:
+        if len(remaining):
+            cells = np.floor((points[remaining] - lo) / size).astype(np.int64)
+            dims = cells.max(axis=0) + 1
+            keys = np.ravel_multi_index(cells.T, dims)
+            # First point of each occupied voxel (in scan order)
+            _, first = np.unique(keys, return_index=True)
+            first.sort()
+            chosen = remaining[first]
+            chosen_parts.append(chosen)
+            taken += len(chosen)
+            keep = np.ones(len(remaining), dtype=bool)
+            keep[first] = False
+            remaining = remaining[keep]
+        voxel_ends.append(taken)
+
+    chosen_parts.append(remaining)
+    order = np.concatenate(chosen_parts)
+    return (order if index is None else index[order]), voxel_ends
+
+
+def build_lod(points, voxel_sizes=LOD_VOXEL_SIZES):
+    """
+    Reorder points for progressive delivery (see PointLOD).
+    Non-finite points (e.g. sensor no-returns stored as NaN) are dropped.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    order, voxel_ends = lod_order(points, voxel_sizes)
+    return PointLOD(np.ascontiguousarray(points[order]), list(voxel_sizes), voxel_ends)
@@ -0,0 +1,170 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds): 0.5 ms .. 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Payload buckets (bytes): 1 KB .. 64 MB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with fixed labels, e.g.
+    Histogram("stage_seconds", "...", ("endpoint", "stage")).observe(0.01, "points", "encode").
+    """
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def collect(self):
+        with self._lock:
+            snapshot = {labels: list(s) for labels, s in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Histograms plus collectors evaluated at scrape time. A collector returns
+    [(name, type, help, [(labels dict, value)])], e.g. for cache statistics
+    that already live elsewhere.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        h = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(h)
+        return h
+
+    def register_collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "calib_http_request_duration_seconds", "HTTP request latency until the last body byte is sent.",
+    ("route", "method", "status"))
+RESPONSE_BYTES = REGISTRY.histogram(
+    "calib_http_response_bytes", "HTTP response body size.", ("route",), SIZE_BUCKETS)
+STAGE_SECONDS = REGISTRY.histogram(
+    "calib_stage_duration_seconds", "Time spent in one stage of serving a request.", ("endpoint", "stage"))
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "calib_payload_bytes", "Size of the data an endpoint produced.", ("endpoint", "kind"), SIZE_BUCKETS)
+
+
+@contextmanager
+def timed(endpoint, stage):
+    """
+    Record the duration of the block as `stage` of `endpoint` in STAGE_SECONDS.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, endpoint, stage)
+
+
+def observe_stage(endpoint, stage, seconds):
+    STAGE_SECONDS.observe(seconds, endpoint, stage)
+
+
+def observe_bytes(endpoint, kind, size):
+    PAYLOAD_BYTES.observe(size, endpoint, kind)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into REQUEST_SECONDS and
+    RESPONSE_BYTES, labelled with the route template (not the raw path, so
+    frame numbers do not create a series each).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        status = [500]
+        sent = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # The static files mount has an empty path
+            name = getattr(route, "path", None) or ("static" if route is not None else "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, name, scope["method"], str(status[0]))
+            RESPONSE_BYTES.observe(sent[0], name)
@@ -0,0 +1,235 @@
+"""
+Build a scene's paired/ tree from raw timestamped sensor streams.
+
+Input is one directory per sensor (port_* with .jpg images, lidar_os2_pcd
+with .pcd sweeps) whose file names are capture timestamps: integer
+nanoseconds, microseconds, milliseconds or seconds (told apart by
+magnitude), or decimal seconds such as 1700000000.123456.
+
+Every LiDAR sweep becomes a frame; each camera contributes the image
+nearest in time, found for all sweeps at once with searchsorted on the
+sorted timestamps. Sweeps where a camera has no image within --max-skew-ms
+are dropped (or kept without that image with --allow-missing). Frames are
+numbered 0..N-1 in time order and linked into paired/<sensor>/<frame>.<ext>
+(hard links, or symlinks with --symlink or across file systems), so nothing
+is copied. paired/pairing.json records the source file and camera-LiDAR
+skew (ms, camera minus LiDAR) of every frame plus per-camera statistics.
+
+Usage:
+    python pair_sensors.py RAW_DIR data/<scene> [--max-skew-ms 50] [--allow-missing]
+                           [--symlink] [--force] [--workers 8]
+"""
+import argparse
+import errno
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scene_manifest import LIDAR_DIR, IMAGE_EXT, sensor_ext
+
+# Half the period of a 10 Hz sweep
+DEFAULT_MAX_SKEW_MS = 50.0
+PAIRING_NAME = "pairing.json"
+
+
+def parse_timestamp(stem):
+    """
+    Nanoseconds from a file name stem, or None if it is not a timestamp.
+    """
+    try:
+        if '.' in stem:
+            return round(float(stem) * 1e9)
+        value = int(stem)
+    except ValueError:
+        return None
+    # Unix time in s ~1.7e9, ms ~1.7e12, us ~1.7e15, ns ~1.7e18
+    for limit, scale in ((1e11, 10 ** 9), (1e14, 10 ** 6), (1e17, 10 ** 3)):
+        if value < limit:
+            return value * scale
+    return value
+
+
+def scan_stream(sensor_dir, ext):
+    """
+    (timestamps (N,) int64 ns, file names) of a sensor directory, sorted by time.
+    Files whose names are not timestamps are skipped.
+    """
+    names = []
+    stamps = []
+    with os.scandir(sensor_dir) as it:
+        for entry in it:
+            if entry.name.endswith(ext):
+                ts = parse_timestamp(entry.name[:-len(ext)])
+                if ts is not None:
+                    names.append(entry.name)
+                    stamps.append(ts)
+    stamps = np.array(stamps, dtype=np.int64)
+    order = np.argsort(stamps, kind='stable')
+    return stamps[order], [names[i] for i in order]
+
+
+def match_nearest(ref, stamps):
+    """
+    For each reference time, (index into stamps of the nearest one, signed
+    skew stamps[index] - ref in ns). Both arrays must be sorted.
+    """
+    if len(stamps) == 0:
+        return np.zeros(len(ref), dtype=np.intp), np.full(len(ref), np.iinfo(np.int64).max)
+    right = np.searchsorted(stamps, ref)
+    left = np.clip(right - 1, 0, len(stamps) - 1)
+    right = np.clip(right, 0, len(stamps) - 1)
+    skew_left = stamps[left] - ref
+    skew_right = stamps[right] - ref
+    use_right = np.abs(skew_right) < np.abs(skew_left)
+    return np.where(use_right, right, left), np.where(use_right, skew_right, skew_left)
+
+
+def skew_stats(skew_ms):
+    a = np.abs(skew_ms)
+    if len(a) == 0:
+        return {"matched": 0}
+    return {"matched": len(a), "mean_abs_ms": float(a.mean()), "p50_abs_ms": float(np.percentile(a, 50)),
+            "p95_abs_ms": float(np.percentile(a, 95)), "max_abs_ms": float(a.max()),
+            "mean_ms": float(np.mean(skew_ms))}
+
+
+def pair(raw_dir, max_skew_ms=DEFAULT_MAX_SKEW_MS, allow_missing=False):
+    """
+    Match every camera stream under raw_dir to the LiDAR sweeps. Returns
+    (lidar names, lidar times, {port: (names, index, skew_ns, ok)}, frames
+    kept) where index/skew/ok are per sweep and `kept` indexes the sweeps
+    that become frames.
+    """
+    lidar_ts, lidar_names = scan_stream(os.path.join(raw_dir, LIDAR_DIR), sensor_ext(LIDAR_DIR))
+    ports = sorted(d for d in os.listdir(raw_dir) if d.startswith("port_") and os.path.isdir(os.path.join(raw_dir, d)))
+    max_skew = int(max_skew_ms * 1e6)
+
+    matches = {}
+    complete = np.ones(len(lidar_ts), dtype=bool)
+    for port in ports:
+        stamps, names = scan_stream(os.path.join(raw_dir, port), IMAGE_EXT)
+        index, skew = match_nearest(lidar_ts, stamps)
+        ok = np.abs(skew) <= max_skew
+        matches[port] = (names, index, skew, ok)
+        complete &= ok
+    if allow_missing:
+        # At least one camera, or there is nothing to calibrate against
+        kept = np.flatnonzero(np.any([m[3] for m in matches.values()], axis=0)) if matches else np.arange(0)
+    else:
+        kept = np.flatnonzero(complete)
+    return lidar_names, lidar_ts, matches, kept
+
+
+def _link(src, dst, symlink):
+    if symlink:
+        os.symlink(os.path.relpath(src, os.path.dirname(dst)), dst)
+        return
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        # Hard links cannot cross file systems
+        os.symlink(os.path.abspath(src), dst)
+
+
+def _link_all(links, symlink):
+    for src, dst in links:
+        _link(src, dst, symlink)
+
+
+def _clear(sensor_dir):
+    with os.scandir(sensor_dir) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                os.unlink(entry.path)
+
+
+def write_paired(raw_dir, scene_dir, pairing, symlink=False, force=False, workers=8):
+    """
+    Link the paired files into scene_dir/paired and write pairing.json.
+    Returns the pairing.json record and the number of links made.
+    """
+    lidar_names, lidar_ts, matches, kept = pairing
+    paired_dir = os.path.join(scene_dir, "paired")
+    sensors = [LIDAR_DIR] + list(matches)
+    for sensor in sensors:
+        sensor_dir = os.path.join(paired_dir, sensor)
+        if os.path.isdir(sensor_dir) and os.listdir(sensor_dir):
+            if not force:
+                raise FileExistsError(f"{sensor_dir} is not empty (use --force to replace it)")
+            _clear(sensor_dir)
+        os.makedirs(sensor_dir, exist_ok=True)
+
+    links = []
+    for frame, i in enumerate(kept):
+        links.append((os.path.join(raw_dir, LIDAR_DIR, lidar_names[i]),
+                      os.path.join(paired_dir, LIDAR_DIR, f"{frame}{sensor_ext(LIDAR_DIR)}")))
+        for port, (names, index, _, ok) in matches.items():
+            if ok[i]:
+                links.append((os.path.join(raw_dir, port, names[index[i]]),
+                              os.path.join(paired_dir, port, f"{frame}{IMAGE_EXT}")))
+    # Link calls release the GIL; threads help most on network file systems
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_link_all, [links[i::workers] for i in range(workers)], [symlink] * workers))
+
+    skews = {}
+    stats = {}
+    for port, (names, index, skew, ok) in matches.items():
+        skew_ms = skew[kept] / 1e6
+        valid = ok[kept]
+        skews[port] = [round(float(s), 3) if v else None for s, v in zip(skew_ms, valid)]
+        stats[port] = skew_stats(skew_ms[valid])
+        # Images that became more than one frame (camera slower than the LiDAR)
+        stats[port]["reused"] = int(len(index[kept][valid]) - len(np.unique(index[kept][valid])))
+    record = {
+        "source": os.path.abspath(raw_dir),
+        "created": time.time(),
+        "sweeps": len(lidar_names),
+        "frames": len(kept),
+        "dropped": len(lidar_names) - len(kept),
+        "stats": stats,
+        "lidar": [lidar_names[i] for i in kept],
+        "lidar_time_ns": lidar_ts[kept].tolist(),
+        "skew_ms": skews,
+    }
+    tmp = os.path.join(paired_dir, f"{PAIRING_NAME}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp, os.path.join(paired_dir, PAIRING_NAME))
+    return record, len(links)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pair raw camera and LiDAR streams into data/<scene>/paired")
+    parser.add_argument("raw_dir", help="directory with port_*/ and lidar_os2_pcd/ of timestamp-named files")
+    parser.add_argument("scene_dir", help="e.g. data/drive_01")
+    parser.add_argument("--max-skew-ms", type=float, default=DEFAULT_MAX_SKEW_MS)
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="keep sweeps where some cameras have no image within the tolerance")
+    parser.add_argument("--symlink", action="store_true", help="symlink instead of hard-linking")
+    parser.add_argument("--force", action="store_true", help="replace an existing paired/ tree")
+    parser.add_argument("--workers", type=int, default=8, help="threads creating links")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    start = time.perf_counter()
+    pairing = pair(args.raw_dir, args.max_skew_ms, args.allow_missing)
+    matched = time.perf_counter()
+    record, links = write_paired(args.raw_dir, args.scene_dir, pairing, args.symlink, args.force, args.workers)
+    print(f"{record['frames']} frames of {record['sweeps']} sweeps, {links} links "
+          f"(scan+match {matched - start:.2f} s, link {time.perf_counter() - matched:.2f} s)")
+    for port, st in record["stats"].items():
+        if st["matched"]:
+            print(f"  {port}: {st['matched']} matched, |skew| p50 {st['p50_abs_ms']:.1f} ms, "
+                  f"p95 {st['p95_abs_ms']:.1f} ms, max {st['max_abs_ms']:.1f} ms, {st['reused']} reused")
+        else:
+            print(f"  {port}: no images within {args.max_skew_ms} ms")
+
+if __name__ == "__main__":
+    main()
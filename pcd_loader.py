@@ -1,77 +1,307 @@
 import numpy as np
-import re
 import struct
 
-def load_pcd(file_path):
+# Optional C implementation of LZF (pip install python-lzf).
+# Falls back to the pure-Python decoder below when missing.
+try:
+    import lzf
+except ImportError:
+    lzf = None
+
+# PCD (TYPE, SIZE) -> numpy dtype
+PCD_TYPES = {
+    ('F', 4): '<f4', ('F', 8): '<f8',
+    ('I', 1): 'i1', ('I', 2): '<i2', ('I', 4): '<i4', ('I', 8): '<i8',
+    ('U', 1): 'u1', ('U', 2): '<u2', ('U', 4): '<u4', ('U', 8): '<u8',
+}
+
+
+def read_pcd_header(f):
     """
-    Loads a PCD file (ASCII or Binary) and returns points as a numpy array.
-    Supports only 'x y z' or 'x y z rgb' fields for now.
+    Parses the PCD header from an open binary file.
+    Leaves the file positioned at the start of the payload.
+
+    Returns a dict with fields, sizes, types, counts, width, height, points,
+    data and data_offset (byte offset of the payload).
     """
-    with open(file_path, 'rb') as f:
-        header = []
-        while True:
-            line = f.readline().decode('ascii').strip()
-            header.append(line)
-            if line.startswith('DATA'):
-                break
-        
-        # Parse header
-        header_map = {}
-        for line in header:
-            parts = line.split()
-            header_map[parts[0]] = parts[1:]
-            
-        data_type = header_map['DATA'][0]
-        points_count = int(header_map['POINTS'][0])
-        
-        # Determine fields and size
-        fields = header_map['FIELDS']
-        # We only care about x, y, z
+    header_map = {}
+    while True:
+        raw = f.readline()
+        if not raw:
+            raise ValueError("Unexpected end of file in PCD header")
+        line = raw.decode('ascii').strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split()
+        header_map[parts[0].upper()] = parts[1:]
+        if parts[0].upper() == 'DATA':
+            break
+
+    fields = header_map['FIELDS']
+    n_fields = len(fields)
+    sizes = [int(s) for s in header_map.get('SIZE', ['4'] * n_fields)]
+    types = header_map.get('TYPE', ['F'] * n_fields)
+    counts = [int(c) for c in header_map.get('COUNT', ['1'] * n_fields)]
+    width = int(header_map.get('WIDTH', ['0'])[0])
+    height = int(header_map.get('HEIGHT', ['1'])[0])
+    # POINTS is optional in the spec, WIDTH * HEIGHT is authoritative
+    points = int(header_map['POINTS'][0]) if 'POINTS' in header_map else width * height
+
+    if not (len(sizes) == len(types) == len(counts) == n_fields):
+        raise ValueError("PCD header FIELDS/SIZE/TYPE/COUNT lengths differ")
+
+    return {
+        'fields': fields,
+        'sizes': sizes,
+        'types': types,
+        'counts': counts,
+        'width': width,
+        'height': height,
+        'points': points,
+        'data': header_map['DATA'][0].lower(),
+        'data_offset': f.tell(),
+    }
+
+
+def pcd_dtype(header):
+    """
+    Structured dtype of one packed point as described by SIZE/TYPE/COUNT.
+    Fields with COUNT > 1 become sub-arrays; PCL padding fields ('_') get unique names.
+    """
+    dtype_list = []
+    for i, (field, t, s, c) in enumerate(zip(header['fields'], header['types'], header['sizes'], header['counts'])):
         try:
-            x_idx = fields.index('x')
-            y_idx = fields.index('y')
-            z_idx = fields.index('z')
-        except ValueError:
-            raise ValueError("PCD file must contain x, y, z fields")
-            
+            base = PCD_TYPES[(t.upper(), s)]
+        except KeyError:
+            raise ValueError(f"Unsupported PCD field type {t}{s} for '{field}'")
+        name = f'_pad{i}' if field == '_' else field
+        dtype_list.append((name, base) if c == 1 else (name, base, (c,)))
+    return np.dtype(dtype_list)
+
+
+def lzf_decompress(data, expected_size):
+    """
+    Decompresses an LZF block (the codec used by PCL's binary_compressed).
+    """
+    if lzf is not None:
+        out = lzf.decompress(bytes(data), expected_size)
+        if out is None or len(out) != expected_size:
+            raise ValueError("LZF decompression failed")
+        return out
+
+    data = memoryview(data)
+    out = bytearray(expected_size)
+    ip = 0
+    op = 0
+    n = len(data)
+    while ip < n:
+        ctrl = data[ip]
+        ip += 1
+        if ctrl < 32:
+            # Literal run of ctrl + 1 bytes
+            length = ctrl + 1
+            out[op:op + length] = data[ip:ip + length]
+            ip += length
+            op += length
+        else:
+            # Back reference
+            length = ctrl >> 5
+            ref = op - ((ctrl & 0x1f) << 8) - 1
+            if length == 7:
+                length += data[ip]
+                ip += 1
+            ref -= data[ip]
+            ip += 1
+            length += 2
+            if ref < 0 or op + length > expected_size:
+                raise ValueError("Corrupt LZF stream")
+            dist = op - ref
+            if dist >= length:
+                out[op:op + length] = out[ref:ref + length]
+            else:
+                # Overlapping copy repeats the last `dist` bytes
+                pattern = bytes(out[ref:op])
+                out[op:op + length] = (pattern * (length // dist + 1))[:length]
+            op += length
+
+    if op != expected_size:
+        raise ValueError("LZF stream shorter than expected")
+    return out
+
+
+def lzf_compress(data):
+    """
+    Compresses with LZF when python-lzf is installed, otherwise emits a valid
+    literal-only stream (no size reduction, but readable by any decoder).
+    """
+    data = bytes(data)
+    if lzf is not None and data:
+        out = lzf.compress(data)
+        if out is not None:
+            return out
+
+    out = bytearray()
+    for i in range(0, len(data), 32):
+        chunk = data[i:i + 32]
+        out.append(len(chunk) - 1)
+        out += chunk
+    return bytes(out)
+
+
+def read_pcd(file_path, fields=None):
+    """
+    Reads the requested fields of a PCD file without copying where possible.
+
+    - binary: the payload is memory-mapped and each field is a strided view into it
+    - binary_compressed: the LZF payload is decoded once; fields are contiguous views
+    - ascii: parsed with np.loadtxt
+
+    Returns (header, {field: array}). Arrays are (N,) or (N, COUNT).
+    """
+    with open(file_path, 'rb') as f:
+        header = read_pcd_header(f)
+        dt = pcd_dtype(header)
+        names = [n for n in dt.names if not n.startswith('_pad')]
+        if fields is None:
+            fields = names
+        missing = [n for n in fields if n not in dt.names]
+        if missing:
+            raise ValueError(f"PCD file has no field(s): {', '.join(missing)}")
+
+        n = header['points']
+        data_type = header['data']
+
         if data_type == 'binary':
-            # Assuming float32 (4 bytes) for x, y, z. Check SIZE and TYPE if needed.
-            # Usually PCD binary is just raw bytes.
-            # We need to know the full point size (stride)
-            sizes = [int(s) for s in header_map['SIZE']]
-            point_step = sum(sizes)
-            
-            raw_data = f.read(points_count * point_step)
-            # Use numpy to read
-            # Create a dtype based on fields
-            # This is a simplification, assuming standard float32 for xyz
-            dt = np.dtype(np.float32)
-            
-            # If the structure is complex, we might need a structured array
-            # But for standard Ouster/Velodyne PCDs, it's usually float32 x, y, z, ...
-            
-            # Let's try to read as structured array
-            # Construct dtype list
-            dtype_list = []
-            types_map = {'F': 'f', 'I': 'i', 'U': 'u'}
-            for i, field in enumerate(fields):
-                t = header_map['TYPE'][i]
-                s = int(header_map['SIZE'][i])
-                dtype_list.append((field, f'{types_map[t]}{s}'))
-                
-            data = np.frombuffer(raw_data, dtype=dtype_list)
-            
-            # Extract x, y, z
-            points = np.stack([data['x'], data['y'], data['z']], axis=-1)
-            return points.astype(np.float32)
+            expected = header['data_offset'] + n * dt.itemsize
+            f.seek(0, 2)
+            if f.tell() < expected:
+                raise ValueError(f"Truncated binary PCD: expected {expected} bytes, got {f.tell()}")
+            if n == 0:
+                records = np.zeros(0, dtype=dt)
+            else:
+                records = np.memmap(file_path, dtype=dt, mode='r', offset=header['data_offset'], shape=(n,))
+            return header, {name: records[name] for name in fields}
+
+        elif data_type == 'binary_compressed':
+            compressed_size, uncompressed_size = struct.unpack('<II', f.read(8))
+            raw = lzf_decompress(f.read(compressed_size), uncompressed_size)
+            if uncompressed_size != n * dt.itemsize:
+                raise ValueError("binary_compressed payload size does not match header")
+
+            # Decompressed payload is column-major: all values of field 0, then field 1, ...
+            columns = {}
+            offset = 0
+            for name in dt.names:
+                field_dt = dt.fields[name][0]
+                base = field_dt.base
+                count = int(np.prod(field_dt.shape)) if field_dt.shape else 1
+                if name in fields:
+                    col = np.frombuffer(raw, dtype=base, count=n * count, offset=offset)
+                    columns[name] = col.reshape(n, count) if field_dt.shape else col
+                offset += n * field_dt.itemsize
+            return header, columns
 
         elif data_type == 'ascii':
-            data = np.loadtxt(f)
-            return data[:, [x_idx, y_idx, z_idx]].astype(np.float32)
-            
+            width = sum(header['counts'])
+            if n:
+                values = np.loadtxt(f, dtype=np.float64, ndmin=2, max_rows=n)
+            else:
+                values = np.zeros((0, width))
+            if values.shape[1] != width:
+                raise ValueError(f"ASCII PCD rows have {values.shape[1]} values, expected {width}")
+            columns = {}
+            col = 0
+            for name in dt.names:
+                field_dt = dt.fields[name][0]
+                count = int(np.prod(field_dt.shape)) if field_dt.shape else 1
+                if name in fields:
+                    block = values[:, col:col + count].astype(field_dt.base)
+                    columns[name] = block if field_dt.shape else block[:, 0]
+                col += count
+            return header, columns
+
         else:
             raise ValueError(f"Unsupported DATA type: {data_type}")
 
+
+def load_pcd(file_path):
+    """
+    Loads a PCD file (ASCII, Binary or Binary Compressed) and returns x, y, z as an (N, 3) float32 array.
+
+    For binary files with packed float32 x, y, z the result is a strided view
+    into the memory-mapped file (no copy). Otherwise the fields are copied once.
+    """
+    header, columns = read_pcd(file_path, ('x', 'y', 'z'))
+    x, y, z = columns['x'], columns['y'], columns['z']
+    n = len(x)
+
+    if header['data'] == 'binary' and n and isinstance(x, np.memmap):
+        dt = pcd_dtype(header)
+        offsets = [dt.fields[name][1] for name in ('x', 'y', 'z')]
+        packed = all(dt.fields[name][0] == np.dtype('<f4') for name in ('x', 'y', 'z'))
+        if packed and offsets[1] == offsets[0] + 4 and offsets[2] == offsets[0] + 8:
+            return np.lib.stride_tricks.as_strided(
+                x, shape=(n, 3), strides=(dt.itemsize, 4), writeable=False
+            )
+
+    points = np.empty((n, 3), dtype=np.float32)
+    points[:, 0] = x
+    points[:, 1] = y
+    points[:, 2] = z
+    return points
+
+
+def save_pcd(file_path, columns, data='binary', width=None):
+    """
+    Writes {field: array} as a PCD v0.7 file with DATA ascii, binary or binary_compressed.
+    Arrays are (N,) or (N, COUNT). Give `width` for an organized cloud
+    (rows of `width` points, HEIGHT = N / width).
+    """
+    types_map = {'f': 'F', 'i': 'I', 'u': 'U'}
+    names = list(columns)
+    arrays = [np.asarray(columns[name]) for name in names]
+    n = len(arrays[0])
+    counts = [1 if a.ndim == 1 else a.shape[1] for a in arrays]
+    if width is None or n == 0:
+        width = n
+    if n and n % width:
+        raise ValueError(f"{n} points do not form rows of width {width}")
+    dt = np.dtype([(name, a.dtype.newbyteorder('<')) if a.ndim == 1 else (name, a.dtype.newbyteorder('<'), (a.shape[1],))
+                   for name, a in zip(names, arrays)])
+
+    header = (
+        "# .PCD v0.7 - Point Cloud Data file format\n"
+        "VERSION 0.7\n"
+        f"FIELDS {' '.join(names)}\n"
+        f"SIZE {' '.join(str(a.dtype.itemsize) for a in arrays)}\n"
+        f"TYPE {' '.join(types_map[a.dtype.kind] for a in arrays)}\n"
+        f"COUNT {' '.join(str(c) for c in counts)}\n"
+        f"WIDTH {width}\n"
+        f"HEIGHT {n // width if width else 1}\n"
+        "VIEWPOINT 0 0 0 1 0 0 0\n"
+        f"POINTS {n}\n"
+        f"DATA {data}\n"
+    )
+
+    with open(file_path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        if data == 'binary':
+            records = np.empty(n, dtype=dt)
+            for name, a in zip(names, arrays):
+                records[name] = a
+            f.write(records.tobytes())
+        elif data == 'binary_compressed':
+            raw = b''.join(np.ascontiguousarray(a, dtype=a.dtype.newbyteorder('<')).tobytes() for a in arrays)
+            compressed = lzf_compress(raw)
+            f.write(struct.pack('<II', len(compressed), len(raw)))
+            f.write(compressed)
+        elif data == 'ascii':
+            table = np.column_stack([a.reshape(n, -1).astype(np.float64) for a in arrays])
+            np.savetxt(f, table, fmt='%.9g')
+        else:
+            raise ValueError(f"Unsupported DATA type: {data}")
+
+
 if __name__ == "__main__":
     # Test
     import sys
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import math
+import time
+
+from starlette.websockets import WebSocketDisconnect
+
+DEFAULT_FPS = 10.0
+MIN_FPS = 0.5
+MAX_FPS = 30.0
+# Frames sent but not yet acknowledged by the client
+MAX_IN_FLIGHT = 2
+# Seconds after which an unacknowledged frame is assumed lost
+ACK_TIMEOUT = 2.0
+
+
+class PlaybackSession:
+    """
+    Server-paced playback over a WebSocket.
+
+    The client sends JSON commands:
+        {"cmd": "play", "frame": "12", "fps": 10}   start (optionally at a frame / rate)
+        {"cmd": "pause"}
+        {"cmd": "seek", "frame": "12"}              jump; the frame is sent even when paused
+        {"cmd": "rate", "fps": 5}
+        {"cmd": "ack", "seq": 7}                    frame 7 has been drawn
+
+    The frame shown at any moment follows the wall clock (start + elapsed * fps).
+    At most MAX_IN_FLIGHT frames are unacknowledged; while the client is
+    behind, the frames that fall due are dropped rather than queued, so the
+    stream always delivers the newest frame the client can keep up with.
+
+    `render_frame(frame, seq)` is a coroutine returning the list of buffers of
+    one binary message. The server also sends text messages:
+    {"type": "state", ...} after each command and {"type": "error", ...}.
+    """
+
+    def __init__(self, websocket, frames, render_frame, fps=DEFAULT_FPS):
+        self.websocket = websocket
+        self.frames = frames
+        self.frame_index = {f: i for i, f in enumerate(frames)}
+        self.render_frame = render_frame
+        self.fps = fps
+        self.playing = False
+        self.index = 0            # position at anchor_time
+        self.anchor_time = time.monotonic()
+        self.last_sent = None     # index of the last frame sent
+        self.pending_seek = False
+        self.seq = 0
+        self.in_flight = {}       # seq -> send time
+        self.sent = 0
+        self.dropped = 0
+        self._changed = asyncio.Event()
+
+    async def run(self):
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            while True:
+                message = await self.websocket.receive_text()
+                try:
+                    command = json.loads(message)
+                except ValueError:
+                    await self._send_json({"type": "error", "detail": "Invalid JSON"})
+                    continue
+                if not isinstance(command, dict):
+                    await self._send_json({"type": "error", "detail": "Commands must be JSON objects"})
+                    continue
+                await self._handle(command)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            try:
+                await sender
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+
+    def _position(self):
+        if not self.playing:
+            return self.index
+        elapsed = time.monotonic() - self.anchor_time
+        return (self.index + int(elapsed * self.fps)) % len(self.frames)
+
+    def _reanchor(self, index=None):
+        self.index = self._position() if index is None else index
+        self.anchor_time = time.monotonic()
+
+    async def _handle(self, command):
+        cmd = command.get("cmd")
+        if cmd == "ack":
+            seq = command.get("seq")
+            if isinstance(seq, int):
+                self.in_flight.pop(seq, None)
+            self._changed.set()
+            return
+
+        # Checked before anything changes, so a bad command leaves the session as it was
+        fps = None
+        if cmd in ("play", "rate") and command.get("fps") is not None:
+            try:
+                fps = float(command["fps"])
+            except (TypeError, ValueError):
+                fps = math.nan
+            if not math.isfinite(fps):
+                await self._send_json({"type": "error", "detail": f"Invalid fps: {command['fps']}"})
+                return
+
+        if cmd in ("play", "seek") and command.get("frame") is not None:
+            frame = str(command["frame"])
+            if frame not in self.frame_index:
+                await self._send_json({"type": "error", "detail": f"Unknown frame: {frame}"})
+                return
+            self._reanchor(self.frame_index[frame])
+            self.pending_seek = True
+        if fps is not None:
+            self._reanchor()
+            self.fps = min(max(fps, MIN_FPS), MAX_FPS)
+
+        if cmd == "play":
+            if not self.playing:
+                self._reanchor()
+                self.playing = True
+        elif cmd == "pause":
+            self._reanchor()
+            self.playing = False
+        elif cmd not in ("seek", "rate"):
+            await self._send_json({"type": "error", "detail": f"Unknown command: {cmd}"})
+            return
+
+        self._changed.set()
+        await self._send_json(self._state())
+
+    def _state(self):
+        return {
+            "type": "state",
+            "playing": self.playing,
+            "frame": self.frames[self._position()],
+            "fps": self.fps,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+    async def _wait(self, timeout=None):
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _send_loop(self):
+        while True:
+            if not self.playing and not self.pending_seek:
+                await self._wait()
+                continue
+
+            target = self._position()
+            if target == self.last_sent and not self.pending_seek:
+                # Sleep until the next frame falls due
+                elapsed = time.monotonic() - self.anchor_time
+                await self._wait((int(elapsed * self.fps) + 1) / self.fps - elapsed)
+                continue
+
+            now = time.monotonic()
+            for seq, sent_at in list(self.in_flight.items()):
+                if now - sent_at > ACK_TIMEOUT:
+                    del self.in_flight[seq]
+            if len(self.in_flight) >= MAX_IN_FLIGHT:
+                # Backpressure: whatever falls due meanwhile is skipped
+                await self._wait(1.0 / self.fps)
+                continue
+
+            if self.last_sent is not None and not self.pending_seek:
+                skipped = (target - self.last_sent) % len(self.frames) - 1
+                self.dropped += max(skipped, 0)
+            self.pending_seek = False
+            self.last_sent = target
+            await self._send_frame(self.frames[target])
+
+    async def _send_frame(self, frame):
+        self.seq += 1
+        seq = self.seq
+        try:
+            buffers = await self.render_frame(frame, seq)
+        except Exception as e:
+            await self._send_json({"type": "error", "frame": frame, "detail": getattr(e, "detail", str(e))})
+            return
+        self.in_flight[seq] = time.monotonic()
+        self.sent += 1
+        await self.websocket.send_bytes(b"".join(buffers))
+
+    async def _send_json(self, data):
+        await self.websocket.send_text(json.dumps(data))
@@ -0,0 +1,157 @@
+import json
+import struct
+import numpy as np
+
+# Binary point buffer layout (little endian):
+#   magic      4s   b'PTS1'
+#   encoding   u2   0 = float32, 1 = int16 fixed point
+#   stride     u2   components per point (always 3: x y z)
+#   count      u4   number of points
+#   scale      3f4  per-axis scale (int16 only, 1.0 for float32)
+#   offset     3f4  per-axis offset (int16 only, 0.0 for float32)
+# followed by count * stride values of the given encoding.
+# The header is 36 bytes so the payload stays aligned for Float32Array/Int16Array.
+MAGIC = b'PTS1'
+HEADER = struct.Struct('<4sHHI3f3f')
+
+ENCODING_F32 = 0
+ENCODING_I16 = 1
+
+FORMATS = {
+    "f32": ENCODING_F32,
+    "i16": ENCODING_I16,
+}
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "f32": "application/x-points-f32",
+    "i16": "application/x-points-i16",
+}
+
+INT16_RANGE = 32767
+
+
+def negotiate_format(fmt=None, accept=None):
+    """
+    Pick the point transport format from an explicit `format=` query value
+    or, failing that, the Accept header. Defaults to JSON.
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unknown point format: {fmt}")
+        return fmt
+
+    if accept:
+        accept = accept.lower()
+        if MEDIA_TYPES["i16"] in accept:
+            return "i16"
+        if MEDIA_TYPES["f32"] in accept or "application/octet-stream" in accept:
+            return "f32"
+
+    return "json"
+
+
+def encode_points(points, fmt):
+    """
+    Encode (N, 3) points for the binary transport.
+
+    Returns (header_bytes, payload) where payload is a buffer that can be
+    written straight to the socket. For float32 the payload is a view on the
+    points array itself, so no copy is made when it is already contiguous.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    count = len(points)
+
+    if fmt == "f32":
+        header = HEADER.pack(MAGIC, ENCODING_F32, 3, count, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0)
+        # Flat first: memoryview cannot cast a (0, 3) view
+        return header, memoryview(points.reshape(-1)).cast('B')
+
+    if fmt == "i16":
+        if count:
+            lo = points.min(axis=0)
+            hi = points.max(axis=0)
+        else:
+            lo = hi = np.zeros(3, dtype=np.float32)
+        offset = (lo + hi) * 0.5
+        scale = (hi - lo) / (2 * INT16_RANGE)
+        # Flat axes (e.g. empty or planar clouds) would divide by zero
+        scale[scale == 0] = 1.0
+
+        quantized = np.rint((points - offset) / scale).astype(np.int16)
+
+        header = HEADER.pack(MAGIC, ENCODING_I16, 3, count, *scale.tolist(), *offset.tolist())
+        return header, memoryview(quantized.reshape(-1)).cast('B')
+
+    raise ValueError(f"Unsupported binary point format: {fmt}")
+
+
+PROJECTION_MEDIA_TYPE = "application/x-projection"
+PROJECTION_PREFIX = struct.Struct('<I')
+
+
+def encode_projection(meta, cameras):
+    """
+    Encode per-camera projections (see calibration_utils.project_points_multi).
+
+    Layout: u32 JSON length, JSON header (padded to 4 bytes), then per camera
+    u uint16[n], v uint16[n], depth float32[n], index uint32[n].
+    The JSON header carries `meta` plus a `cameras` list with each camera's
+    port, count and byte offset of its block.
+
+    Returns a list of buffers to be written in order.
+    """
+    blocks = []
+    entries = []
+    offset = 0
+    for port, proj in cameras:
+        n = len(proj['index'])
+        uv = np.clip(proj['uv'], 0, 65535).astype(np.uint16)
+        parts = [
+            np.ascontiguousarray(uv[:, 0]),
+            np.ascontiguousarray(uv[:, 1]),
+            proj['depth'].astype(np.float32),
+            proj['index'].astype(np.uint32),
+        ]
+        entries.append({"port": port, "count": n, "offset": offset})
+        for part in parts:
+            blocks.append(memoryview(part).cast('B'))
+        offset += 12 * n
+
+    header = json.dumps(dict(meta, cameras=entries)).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return [PROJECTION_PREFIX.pack(len(header)), header] + blocks
+
+
+BUNDLE_MEDIA_TYPE = "application/x-frame-bundle"
+
+
+def encode_bundle(meta, parts):
+    """
+    Pack several payloads into one length-prefixed container.
+
+    `parts` is a list of (name, content_type, buffers) where buffers is a list
+    of bytes-like objects written back to back. Layout: u32 JSON length, JSON
+    header (padded to 4 bytes), then each part padded to 4 bytes so typed
+    arrays can view it in place. The JSON header carries `meta` plus a
+    `parts` list with each part's name, content_type, offset and length
+    (offsets relative to the end of the header).
+
+    Returns a list of buffers to be written in order.
+    """
+    blocks = []
+    entries = []
+    offset = 0
+    for name, content_type, buffers in parts:
+        length = sum(memoryview(b).nbytes for b in buffers)
+        entries.append({"name": name, "content_type": content_type, "offset": offset, "length": length})
+        blocks.extend(buffers)
+        pad = -length % 4
+        if pad:
+            blocks.append(b'\0' * pad)
+        offset += length + pad
+
+    header = json.dumps(dict(meta, parts=entries)).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return [PROJECTION_PREFIX.pack(len(header)), header] + blocks
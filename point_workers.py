@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from pcd_loader import load_pcd
+from lod import build_lod, PointLOD
+
+
+def _timed_load(path):
+    # (PointLOD, {stage: seconds}); copying out of the memory map makes the
+    # disk reads count as loading rather than LOD ordering
+    t0 = time.perf_counter()
+    points = np.ascontiguousarray(load_pcd(path))
+    t1 = time.perf_counter()
+    lod = build_lod(points)
+    return lod, {"pcd_load": t1 - t0, "lod_build": time.perf_counter() - t1}
+
+
+def _load_lod_shared(path):
+    """
+    Worker side: parse and reorder a PCD, then hand the points back in a
+    shared memory block instead of pickling them through the result pipe.
+    """
+    lod, timings = _timed_load(path)
+    points = lod.points
+    shm = shared_memory.SharedMemory(create=True, size=max(points.nbytes, 1))
+    try:
+        np.ndarray(points.shape, dtype=points.dtype, buffer=shm.buf)[:] = points
+    finally:
+        shm.close()
+    return (shm.name, points.shape, lod.voxel_sizes, lod.voxel_ends), timings
+
+
+def _load_lod_local(path):
+    return _timed_load(path)
+
+
+def _attach(result):
+    # Parent side: copy out of the block and free it
+    name, shape, voxel_sizes, voxel_ends = result
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        points = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return PointLOD(points, voxel_sizes, voxel_ends)
+
+
+class PointLoader:
+    """
+    Loads PCD files into lod.PointLOD objects off the request path.
+
+    With workers > 0, parsing and LOD ordering run in a process pool, so
+    concurrent requests do not serialize on the GIL; workers == 0 keeps the
+    work in a thread of this process. Concurrent loads of the same key share
+    one Future. The pool is created by start(), or by the first load if
+    start() was not called.
+
+    observe(stage, seconds), if given, receives the time of each load's
+    stages: queue (waiting for a worker), pcd_load (reading and decoding the
+    file), lod_build and transfer (copying out of shared memory).
+    """
+
+    def __init__(self, workers, observe=None):
+        self.workers = workers
+        self.observe = observe
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future of PointLOD
+        self._start_lock = threading.Lock()
+        self._executor = None
+
+    def start(self):
+        # Call before the process starts other threads, so the workers fork from a quiet parent
+        with self._start_lock:
+            if self._executor is None:
+                self._executor = self._make_executor()
+        return self._executor
+
+    def _make_executor(self):
+        if self.workers > 0:
+            # Start the tracker before forking so workers and parent share it;
+            # the parent's unlink then balances the worker's registration
+            resource_tracker.ensure_running()
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+            # Fork the workers now rather than on the first load
+            executor.submit(os.getpid).result()
+            return executor
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pcd-load")
+
+    def submit(self, key, path):
+        """
+        Future of the PointLOD for `path`. If a load for `key` is already
+        running, its Future is returned.
+        """
+        with self._lock:
+            fut = self._in_flight.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            # Shared by every waiter, so one of them giving up must not cancel it
+            fut.set_running_or_notify_cancel()
+            self._in_flight[key] = fut
+
+        fn = _load_lod_shared if self.workers > 0 else _load_lod_local
+        submitted = time.perf_counter()
+        try:
+            inner = (self._executor or self.start()).submit(fn, path)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool
+            self._executor = self._make_executor()
+            inner = self._executor.submit(fn, path)
+        inner.add_done_callback(lambda f: self._finish(key, fut, f, submitted))
+        return fut
+
+    def load(self, key, path):
+        return self.submit(key, path).result()
+
+    def _finish(self, key, fut, inner, submitted):
+        timings = None
+        try:
+            result, timings = inner.result()
+            t0 = time.perf_counter()
+            if self.workers > 0:
+                result = _attach(result)
+            timings["transfer"] = time.perf_counter() - t0
+            timings["queue"] = max(0.0, t0 - submitted - timings["pcd_load"] - timings["lod_build"])
+            fut.set_result(result)
+        except Exception as e:
+            fut.set_exception(e)
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if timings is not None and self.observe is not None:
+            for stage, seconds in timings.items():
+                self.observe(stage, seconds)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def default_workers():
+    return min(4, os.cpu_count() or 1)
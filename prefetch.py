@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """
+    Loads upcoming frames on a background worker so playback finds them cached.
+
+    Each call to schedule() describes the window of frames that should be
+    warm next for one owner (a client session). Queued frames of that owner
+    that fall outside the new window (a seek or a scene switch) are
+    cancelled; frames already in the window keep their place so steady
+    playback does not churn the queue. Other owners' windows are untouched.
+    """
+
+    def __init__(self, load_fn, workers=1):
+        # load_fn(scene, frame) loads a frame into the point cache
+        self._load_fn = load_fn
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        # Re-entrant: Future.cancel() runs done-callbacks (_forget) synchronously
+        self._lock = threading.RLock()
+        self._queued = {}  # owner -> {(scene, frame): Future}
+
+    def schedule(self, owner, scene, frames, is_cached=None):
+        wanted = [(scene, f) for f in frames]
+        wanted_set = set(wanted)
+        with self._lock:
+            queued = self._queued.setdefault(owner, {})
+            for key, fut in list(queued.items()):
+                if key not in wanted_set:
+                    fut.cancel()
+                    queued.pop(key, None)
+            # Cancelling runs _forget, which drops the owner's dict once it is empty
+            self._queued[owner] = queued
+
+            submitted = []
+            for key in wanted:
+                if key in queued:
+                    continue
+                if is_cached is not None and is_cached(*key):
+                    continue
+                fut = self._executor.submit(self._load_fn, *key)
+                queued[key] = fut
+                submitted.append((key, fut))
+            if not queued:
+                self._queued.pop(owner, None)
+            # Only now: a future that is already done runs _forget right away,
+            # which must not drop the dict while it is still being filled
+            for key, fut in submitted:
+                fut.add_done_callback(lambda f, key=key: self._forget(owner, key, f))
+
+    def cancel(self, owner=None):
+        """
+        Drop the queued frames of `owner`, or of everyone if owner is None.
+        """
+        with self._lock:
+            owners = list(self._queued) if owner is None else [owner]
+            for o in owners:
+                for fut in list(self._queued.pop(o, {}).values()):
+                    fut.cancel()
+
+    def _forget(self, owner, key, fut):
+        with self._lock:
+            queued = self._queued.get(owner)
+            # Only drop the entry if it was not re-queued in the meantime
+            if queued is not None and queued.get(key) is fut:
+                del queued[key]
+                if not queued:
+                    del self._queued[owner]
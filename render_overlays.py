@@ -0,0 +1,194 @@
+"""
+Headless QA videos: LiDAR points projected onto every camera image of every
+frame with the saved config, one video per port.
+
+Frames are rendered in a process pool (load_pcd, or the preprocessed .pts
+file when there is one, and project_points_multi with each camera's model)
+and written in order by one cv2.VideoWriter per port in the parent. Points
+are colored by height like the browser overlay (red high, blue low) and
+drawn far to near. Frames hidden by the scene's validation report (see
+check_gaps.py) are skipped.
+
+Usage:
+    python render_overlays.py SCENE [--data-root data] [--config config.json]
+                              [--out overlays] [--width 960] [--fps 10]
+                              [--points 150000] [--ports port_1,port_2]
+                              [--start 0] [--count N] [--workers N]
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from calibration_utils import project_points_multi
+from config_store import export_inputs, export_worker, init_export_worker
+from lod import build_lod
+from pcd_loader import load_pcd
+from preprocess import columnar_path, read_pts_header, load_pts, is_current
+from scene_manifest import ManifestIndex, LIDAR_DIR
+
+DEFAULT_WIDTH = 960
+DEFAULT_FPS = 10
+FOURCC = "mp4v"
+# Height range of the color map (metres), as in the browser's heightColor
+COLOR_MIN_Z = -2.0
+COLOR_MAX_Z = 5.0
+POINT_SIZE = 2
+# Frames submitted but not yet written, per worker: rendering outpaces the
+# writers on many cores, and each frame is ~2 MB per port
+IN_FLIGHT_PER_WORKER = 2
+
+
+def height_colors(z):
+    """
+    BGR uint8 colors: hue 0 (red) at COLOR_MAX_Z to 240 (blue) at COLOR_MIN_Z.
+    """
+    t = np.clip((z - COLOR_MIN_Z) / (COLOR_MAX_Z - COLOR_MIN_Z), 0, 1)
+    # OpenCV 8-bit hue is degrees / 2
+    hsv = np.empty((len(z), 1, 3), dtype=np.uint8)
+    hsv[:, 0, 0] = np.rint((1 - t) * 120).astype(np.uint8)
+    hsv[:, 0, 1:] = 255
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[:, 0]
+
+
+def draw_points(img, uv, depth, colors, scale):
+    """
+    Draw POINT_SIZE squares at uv * scale, far points first so near ones win.
+    """
+    order = np.argsort(-depth)
+    u = (uv[order, 0] * scale).astype(np.intp)
+    v = (uv[order, 1] * scale).astype(np.intp)
+    c = colors[order]
+    h, w = img.shape[:2]
+    for dy in range(POINT_SIZE):
+        for dx in range(POINT_SIZE):
+            uu, vv = u + dx, v + dy
+            inside = (uu < w) & (vv < h)
+            img[vv[inside], uu[inside]] = c[inside]
+
+
+def _init_worker(cameras, state):
+    init_export_worker(cameras, dict(state, manifest=ManifestIndex(state["data_root"]).get(state["scene"])))
+
+
+def _frame_points(frame):
+    w = export_worker
+    manifest = w["manifest"]
+    if not manifest.has(LIDAR_DIR, frame):
+        return None
+    pcd_path = manifest.file_path(LIDAR_DIR, frame)
+    # The preprocessed file is already LOD-ordered, so a prefix is a uniform subsample
+    pts_path = columnar_path(w["data_root"], w["scene"], frame)
+    try:
+        st = os.stat(pcd_path)
+        header = read_pts_header(pts_path)
+        if is_current(header, st.st_size, st.st_mtime_ns):
+            return load_pts(pts_path, header).points[:w["max_points"] or None]
+    except (OSError, ValueError):
+        pass
+    points = load_pcd(pcd_path)
+    if w["max_points"] and len(points) > w["max_points"]:
+        return build_lod(points).points[:w["max_points"]]
+    return np.asarray(points, dtype=np.float32)[np.isfinite(points).all(axis=1)]
+
+
+def render_frame(frame):
+    """
+    BGR overlay images of every port for one frame, in port order.
+    """
+    w = export_worker
+    manifest = w["manifest"]
+    points = _frame_points(frame)
+    projections = project_points_multi(points, w["models"]) if points is not None and len(points) else None
+    colors = height_colors(points[:, 2]) if projections else None
+
+    images = []
+    for c, (port, model) in enumerate(zip(w["ports"], w["models"])):
+        scale = w["width"] / model.width
+        size = (w["width"], round(model.height * scale))
+        img = cv2.imread(manifest.file_path(port, frame)) if manifest.has(port, frame) else None
+        if img is None:
+            img = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+            cv2.putText(img, "no image", (20, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 2)
+        else:
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        if projections:
+            p = projections[c]
+            draw_points(img, p['uv'], p['depth'], colors[p['index']], scale)
+        cv2.putText(img, f"{port} {frame}", (10, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        images.append(img)
+    return images
+
+
+def render_in_order(pool, frames, window):
+    """
+    render_frame results in frame order, with at most `window` frames
+    submitted and not yet consumed.
+    """
+    frames = iter(frames)
+    pending = deque(pool.submit(render_frame, f) for _, f in zip(range(window), frames))
+    while pending:
+        images = pending.popleft().result()
+        frame = next(frames, None)
+        if frame is not None:
+            pending.append(pool.submit(render_frame, frame))
+        yield images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render LiDAR overlay videos of a scene, one per camera")
+    parser.add_argument("scene")
+    parser.add_argument("--data-root", default="data")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--out", default="overlays", help="videos go to OUT/<scene>/<port>.mp4")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="video width (pixels)")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS)
+    parser.add_argument("--points", type=int, default=150000, help="points per frame (0 = all)")
+    parser.add_argument("--ports", default=None, help="comma-separated (default: every camera in the config)")
+    parser.add_argument("--start", type=int, default=0, help="index of the first frame")
+    parser.add_argument("--count", type=int, default=None, help="number of frames (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    try:
+        _, cameras, frames = export_inputs(args.data_root, args.scene, args.config, args.ports, "port_1")
+    except ValueError as e:
+        parser.error(str(e))
+    frames = frames[args.start:None if args.count is None else args.start + args.count]
+    if not frames:
+        parser.error("No frames to render")
+
+    out_dir = os.path.join(args.out, args.scene)
+    os.makedirs(out_dir, exist_ok=True)
+    writers = {}
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cameras, {"scene": args.scene, "data_root": args.data_root, "width": args.width,
+                                                "max_points": args.points})) as pool:
+        for n, images in enumerate(render_in_order(pool, frames, IN_FLIGHT_PER_WORKER * workers), 1):
+            for port, img in zip(cameras, images):
+                writer = writers.get(port)
+                if writer is None:
+                    path = os.path.join(out_dir, f"{port}.mp4")
+                    writer = writers[port] = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*FOURCC), args.fps,
+                                                             (img.shape[1], img.shape[0]))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"Could not open a {FOURCC} video writer for {path}")
+                writer.write(img)
+            if n % 50 == 0:
+                print(f"{n}/{len(frames)} frames, {n / (time.perf_counter() - start):.1f} frames/s")
+    for writer in writers.values():
+        writer.release()
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(frames)} frames x {len(cameras)} ports in {elapsed:.1f} s: {len(frames) / elapsed:.1f} frames/s "
+          f"({len(frames) * len(cameras) / elapsed:.1f} images/s) with {workers} workers -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Sensor directories inside paired/ and the file extension each one holds
+LIDAR_DIR = "lidar_os2_pcd"
+IMAGE_EXT = ".jpg"
+PCD_EXT = ".pcd"
+# Seconds between directory mtime checks; keeps stat calls off the hot path on NFS
+MANIFEST_TTL = float(os.environ.get("MANIFEST_TTL", "2"))
+
+
+def frame_sort_key(frame):
+    # Numeric frames first, in numeric order; anything else after, by name
+    try:
+        return (0, int(frame), frame)
+    except ValueError:
+        return (1, 0, frame)
+
+
+def sensor_ext(sensor):
+    return PCD_EXT if sensor == LIDAR_DIR else IMAGE_EXT
+
+
+def _dir_mtimes(paired_dir):
+    mtimes = {".": os.stat(paired_dir).st_mtime_ns}
+    with os.scandir(paired_dir) as it:
+        for entry in it:
+            if entry.is_dir() and (entry.name.startswith("port_") or entry.name == LIDAR_DIR):
+                mtimes[entry.name] = entry.stat().st_mtime_ns
+    return mtimes
+
+
+class SceneManifest:
+    """
+    Index of every frame in a scene and which sensors have a file for it.
+
+    sizes[sensor][i] / mtimes[sensor][i] describe frames[i]; None means the
+    file is missing.
+    """
+
+    def __init__(self, scene, paired_dir, data):
+        self.scene = scene
+        self.paired_dir = paired_dir
+        self.dir_mtimes = data["dir_mtimes"]
+        self.sensors = data["sensors"]
+        self.frames = data["frames"]
+        self.sizes = data["sizes"]
+        self.mtimes = data["mtimes"]
+        self.index = {f: i for i, f in enumerate(self.frames)}
+        self._frames_with = {}
+        self.checked_at = time.monotonic()
+
+    def to_dict(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "scene": self.scene,
+            "dir_mtimes": self.dir_mtimes,
+            "sensors": self.sensors,
+            "frames": self.frames,
+            "sizes": self.sizes,
+            "mtimes": self.mtimes,
+        }
+
+    def has(self, sensor, frame):
+        i = self.index.get(frame)
+        return i is not None and sensor in self.sizes and self.sizes[sensor][i] is not None
+
+    def file_path(self, sensor, frame):
+        return os.path.join(self.paired_dir, sensor, f"{frame}{sensor_ext(sensor)}")
+
+    def file_size(self, sensor, frame):
+        i = self.index.get(frame)
+        if i is None or sensor not in self.sizes:
+            return None
+        return self.sizes[sensor][i]
+
+    def file_mtime(self, sensor, frame):
+        i = self.index.get(frame)
+        if i is None or sensor not in self.mtimes:
+            return None
+        return self.mtimes[sensor][i]
+
+    def frames_with(self, sensor):
+        """
+        Frames that have a file for `sensor`, in frame order. Do not modify the result.
+        """
+        cached = self._frames_with.get(sensor)
+        if cached is None:
+            sizes = self.sizes.get(sensor, [])
+            frames = [f for f, s in zip(self.frames, sizes) if s is not None]
+            cached = (frames, {f: i for i, f in enumerate(frames)})
+            self._frames_with[sensor] = cached
+        return cached[0]
+
+    def position(self, sensor, frame):
+        """
+        Index of `frame` in frames_with(sensor), or None.
+        """
+        self.frames_with(sensor)
+        return self._frames_with[sensor][1].get(frame)
+
+    def is_stale(self):
+        try:
+            return _dir_mtimes(self.paired_dir) != self.dir_mtimes
+        except FileNotFoundError:
+            return True
+
+
+def build_manifest(scene, paired_dir):
+    """
+    Scan paired/ once: one scandir per sensor directory.
+    """
+    dir_mtimes = _dir_mtimes(paired_dir)
+    sensors = sorted(s for s in dir_mtimes if s != ".")
+
+    per_sensor = {}
+    all_frames = set()
+    for sensor in sensors:
+        ext = sensor_ext(sensor)
+        entries = {}
+        with os.scandir(os.path.join(paired_dir, sensor)) as it:
+            for entry in it:
+                if entry.name.endswith(ext) and entry.is_file():
+                    st = entry.stat()
+                    entries[entry.name[:-len(ext)]] = (st.st_size, st.st_mtime_ns)
+        per_sensor[sensor] = entries
+        all_frames.update(entries)
+
+    frames = sorted(all_frames, key=frame_sort_key)
+    sizes = {}
+    mtimes = {}
+    for sensor, entries in per_sensor.items():
+        sizes[sensor] = [entries[f][0] if f in entries else None for f in frames]
+        mtimes[sensor] = [entries[f][1] if f in entries else None for f in frames]
+
+    return SceneManifest(scene, paired_dir, {
+        "dir_mtimes": dir_mtimes,
+        "sensors": sensors,
+        "frames": frames,
+        "sizes": sizes,
+        "mtimes": mtimes,
+    })
+
+
+def _write_manifest(path, manifest):
+    # Atomic replace so concurrent readers never see a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(manifest.to_dict(), f)
+        os.replace(tmp, path)
+    except OSError:
+        # Read-only data mounts still work, the manifest just stays in memory
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _read_manifest(path, scene, paired_dir):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return SceneManifest(scene, paired_dir, data)
+
+
+class ManifestIndex:
+    """
+    Manifests of all scenes under a data root, cached in memory and on disk
+    (data/<scene>/manifest.json) and rebuilt when a directory mtime changes.
+    """
+
+    def __init__(self, data_root):
+        self.data_root = data_root
+        self._manifests = {}
+        self._scenes = None  # (root mtime, scenes, checked_at)
+        self._lock = threading.Lock()
+
+    def scenes(self):
+        """
+        Scene names (directories with a paired/ subdirectory), sorted.
+        """
+        now = time.monotonic()
+        cached = self._scenes
+        if cached and now - cached[2] < MANIFEST_TTL:
+            return cached[1]
+        try:
+            mtime = os.stat(self.data_root).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if cached and cached[0] == mtime:
+            self._scenes = (mtime, cached[1], now)
+            return cached[1]
+
+        scenes = []
+        with os.scandir(self.data_root) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.isdir(os.path.join(entry.path, "paired")):
+                    scenes.append(entry.name)
+        scenes.sort()
+        self._scenes = (mtime, scenes, now)
+        return scenes
+
+    def get(self, scene):
+        """
+        Manifest of a scene, or None if the scene has no paired/ directory.
+        """
+        manifest = self._manifests.get(scene)
+        now = time.monotonic()
+        if manifest is not None and now - manifest.checked_at < MANIFEST_TTL:
+            return manifest
+
+        with self._lock:
+            manifest = self._manifests.get(scene)
+            if manifest is not None:
+                if not manifest.is_stale():
+                    manifest.checked_at = now
+                    return manifest
+
+            scene_dir = os.path.join(self.data_root, scene)
+            paired_dir = os.path.join(scene_dir, "paired")
+            if not os.path.isdir(paired_dir):
+                self._manifests.pop(scene, None)
+                return None
+
+            path = os.path.join(scene_dir, MANIFEST_NAME)
+            manifest = _read_manifest(path, scene, paired_dir)
+            if manifest is None or manifest.is_stale():
+                manifest = build_manifest(scene, paired_dir)
+                _write_manifest(path, manifest)
+            self._manifests[scene] = manifest
+            return manifest
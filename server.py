@@ -1,161 +1,1012 @@
 import os
-import json
-import glob
+import time
+import asyncio
+import logging
 import base64
+import secrets
+import threading
 import numpy as np
-from fastapi import FastAPI, HTTPException, Body
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Body, Request, WebSocket
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 
-from pcd_loader import load_pcd
-from calibration_utils import project_points
+from point_codec import negotiate_format, encode_points, MEDIA_TYPES, encode_projection, PROJECTION_MEDIA_TYPE, \
+    encode_bundle, BUNDLE_MEDIA_TYPE
+from point_cache import PointCache
+from prefetch import Prefetcher
+from point_workers import PointLoader, default_workers
+from playback import PlaybackSession, DEFAULT_FPS
+from scene_manifest import ManifestIndex, LIDAR_DIR
+from calibration_utils import project_points, project_points_multi
+from camera_models import camera_from_config, DEFAULT_IMAGE_SIZE
+from image_cache import ImageCache, snap_size, clamp_quality, image_etag, jpeg_size
+from auto_calib import CalibrationJobs, alignment_score, scan_edge_points, SCORE_CLIP
+from feature_cache import FeatureCache
+from preprocess import columnar_path, read_pts_header, load_pts, is_current
+from frustum_index import SectorIndex, camera_sectors
+from check_gaps import read_report, hidden_frames as check_hidden_frames, REPORT_NAME
+from config_store import ConfigStore, ConfigConflict, content_hash
+from depth_export import sparse_depth, encode_depth, DEPTH_FORMATS, DEPTH_SCALE
+from metrics import REGISTRY, PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, timed, observe_stage, observe_bytes
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    start_up()
+    yield
+    point_loader.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+# Latency and response size of every request, for /api/metrics
+app.add_middleware(MetricsMiddleware)
 
 DATA_ROOT = "data"
-# Initial default scene (will be updated dynamically)
-CURRENT_SCENE = ""
-DATA_DIR = ""
 CONFIG_FILE = "config.json"
+# Cookies holding a client's selected scene and its session id (for per-client read-ahead)
+SCENE_COOKIE = "scene"
+SESSION_COOKIE = "session"
+# Memory budget for loaded point clouds, shared across scenes
+PCD_CACHE_MB = int(os.environ.get("PCD_CACHE_MB", "2048"))
+# Number of upcoming frames loaded in the background after each /api/points call
+PREFETCH_FRAMES = int(os.environ.get("PREFETCH_FRAMES", "8"))
+# Processes parsing PCD files off the request path (0 = a thread in the server process)
+PCD_WORKERS = int(os.environ.get("PCD_WORKERS", str(default_workers())))
+# Default point count served per frame (clients may ask for more or less)
+MAX_POINTS = 150000
+# Memory budget for server-side camera projections
+PROJECTION_CACHE_MB = int(os.environ.get("PROJECTION_CACHE_MB", "256"))
+# On-disk cache of downscaled camera images
+CACHE_ROOT = os.environ.get("CACHE_ROOT", ".cache")
+IMAGE_CACHE_MB = int(os.environ.get("IMAGE_CACHE_MB", "2048"))
+# Images never change under the same ETag, but clients revalidate so a rewritten frame shows up
+IMAGE_CACHE_CONTROL = "public, no-cache"
+# Edge distance maps of camera images on disk, and decoded in memory
+FEATURE_CACHE_MB = int(os.environ.get("FEATURE_CACHE_MB", "4096"))
+FEATURE_MEMORY_MB = int(os.environ.get("FEATURE_MEMORY_MB", "512"))
+# Frames used by an automatic extrinsic refinement, spread over the scene
+CALIBRATION_FRAMES = int(os.environ.get("CALIBRATION_FRAMES", "5"))
+# Threads reading the parts of a /api/bundle response from disk
+BUNDLE_WORKERS = int(os.environ.get("BUNDLE_WORKERS", "8"))
+# Discover scenes and index the on-disk caches in the background at startup
+# (0: leave all of it to the first request that needs it)
+WARM_UP = os.environ.get("WARM_UP", "1") != "0"
+
+# DEBUG also logs one line per request (off by default: it is on the hot path)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("calibration")
+log.setLevel(LOG_LEVEL)
+
+def log_request(event, **fields):
+    # key=value fields, formatted only when request logging is enabled
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s %s", event, " ".join(f"{k}={v}" for k, v in fields.items()))
+
+log.info("Server starting. Data Root: %s", DATA_ROOT)
+
+# Per-scene frame/file index, cached in memory and in data/<scene>/manifest.json
+manifests = ManifestIndex(DATA_ROOT)
+
+# Downscaled image variants for the grid view
+image_cache = ImageCache(os.path.join(CACHE_ROOT, "images"), IMAGE_CACHE_MB * 1024 * 1024)
+
+# Edge distance maps for alignment scores and auto-refine
+feature_cache = FeatureCache(os.path.join(CACHE_ROOT, "features"), FEATURE_CACHE_MB * 1024 * 1024,
+                             FEATURE_MEMORY_MB * 1024 * 1024)
 
-print(f"Server starting. Data Root: {DATA_ROOT}")
+bundle_pool = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
 
 def get_scenes():
-    if not os.path.exists(DATA_ROOT):
-        return []
-    # Only include directories that have a "paired" subdirectory
-    scenes = []
-    for d in os.listdir(DATA_ROOT):
-        path = os.path.join(DATA_ROOT, d)
-        if os.path.isdir(path) and os.path.exists(os.path.join(path, "paired")):
-            scenes.append(d)
-    return sorted(scenes)
-
-# Initialize scene if possible
-scenes = get_scenes()
-if scenes:
-    # Default to the last one (usually latest timestamp)
-    CURRENT_SCENE = scenes[-1]
-    DATA_DIR = os.path.join(DATA_ROOT, CURRENT_SCENE, "paired")
-    print(f"Initialized with scene: {CURRENT_SCENE}")
-else:
-    print("Warning: No valid scenes found in data/ directory!")
+    # Only directories that have a "paired" subdirectory
+    return manifests.scenes()
+
+def request_scene(request, scene=None):
+    """
+    Scene a request refers to: the explicit `scene` parameter, else the
+    client's scene cookie, else the default (the last scene, usually the
+    latest timestamp). Each client picks its own scene; nothing global changes.
+    """
+    scenes = get_scenes()
+    if scene is None:
+        scene = request.cookies.get(SCENE_COOKIE)
+        if scene not in scenes:
+            # No selection yet, or the scene was removed
+            scene = None
+    if scene is None:
+        if not scenes:
+            raise HTTPException(status_code=404, detail="No scenes found")
+        return scenes[-1]
+    if scene not in scenes:
+        raise HTTPException(status_code=404, detail="Unknown scene")
+    return scene
+
+def session_id(request):
+    # Identifies a client for read-ahead; falls back to its address before the cookie is set
+    session = request.cookies.get(SESSION_COOKIE)
+    if session:
+        return session
+    return request.client.host if request.client else "anonymous"
+
+# Versioned global config (see config_store); per-camera versions let caches
+# and concurrent editors of different cameras ignore each other's changes
+config_store = ConfigStore(CONFIG_FILE)
+# Read-only stores of scene config.json files, used while there is no global config
+_scene_config_stores = {}
+
+def config_store_for(scene=None):
+    # Always prefer the root config to ensure global consistency
+    if config_store.exists() or not scene:
+        return config_store
+    # Fallback: the scene directory's config if the global one doesn't exist
+    path = os.path.join(scene_data_dir(scene), "config.json")
+    if not os.path.exists(path):
+        return config_store
+    store = _scene_config_stores.get(path)
+    if store is None:
+        store = _scene_config_stores.setdefault(path, ConfigStore(path))
+    return store
 
 # Load Config
-def load_config():
-    # Always load from root config to ensure global consistency
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-            
-    # Fallback: Try to load from the current scene directory if global doesn't exist
-    scene_config = os.path.join(DATA_DIR, "config.json")
-    if os.path.exists(scene_config):
-        with open(scene_config, 'r') as f:
-            return json.load(f)
-            
-    return {}
-
-def save_config(config):
-    # Save to the global config file
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
-
-# Cache for PCD data to avoid reloading
-pcd_cache = {}
+def load_config(scene=None):
+    return config_store_for(scene).get()
+
+def config_etag(store, version):
+    # Names the store too, so a scene fallback and the global config never share a tag
+    name = "global" if store is config_store else os.path.basename(os.path.dirname(os.path.dirname(store.path)))
+    return f'"config-{name}-{version}"'
+
+def if_match_version(request):
+    """
+    Base version of a config write from If-Match (an ETag of GET /api/config,
+    or a bare version number). None if absent or "*": no conflict check.
+    """
+    value = request.headers.get("if-match", "").strip().strip('"')
+    if not value or value == "*":
+        return None
+    try:
+        return int(value.rsplit("-", 1)[-1])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a config ETag or version")
+
+def etag_matches(request, etag):
+    # If-None-Match lists `etag`: the client's copy is current (304)
+    return etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+
+def _first_write_seed(scene):
+    # The first write to the global config starts from the scene's fallback config
+    return None if config_store.exists() else load_config(scene)
+
+# Cache for PCD data to avoid reloading, keyed by (scene, frame, size, mtime)
+pcd_cache = PointCache(PCD_CACHE_MB * 1024 * 1024)
+
+def scene_data_dir(scene):
+    return os.path.join(DATA_ROOT, scene, "paired")
+
+# scene -> (report mtime, manifest, frames to hide)
+_hidden_frames = {}
+
+def hidden_frames(scene, manifest):
+    """
+    Frames the scene's validation report (see check_gaps.py) found broken
+    and that have not changed since; empty without a report.
+    """
+    path = os.path.join(DATA_ROOT, scene, REPORT_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return frozenset()
+    cached = _hidden_frames.get(scene)
+    if cached is None or cached[0] != mtime or cached[1] is not manifest:
+        hidden = frozenset(check_hidden_frames(read_report(os.path.dirname(path)), manifest))
+        if hidden:
+            log.info("Hiding %d frames of %s that failed validation", len(hidden), scene)
+        cached = _hidden_frames[scene] = (mtime, manifest, hidden)
+    return cached[2]
+
+def list_frames(scene):
+    """
+    Frame names of a scene (frames with a port_1 image), in numeric order,
+    without the frames its validation report marks as broken.
+    Returns None if the scene does not exist.
+    """
+    manifest = manifests.get(scene)
+    if manifest is None:
+        return None
+    frames = manifest.frames_with("port_1")
+    hidden = hidden_frames(scene, manifest)
+    return [f for f in frames if f not in hidden] if hidden else frames
+
+def _pcd_cache_key(scene, frame):
+    manifest = manifests.get(scene)
+    if manifest is None or not manifest.has(LIDAR_DIR, frame):
+        return None, None
+    path = manifest.file_path(LIDAR_DIR, frame)
+    # Size and mtime of the file itself in the key, so a rewritten file is never
+    # served from cache (the manifest misses files rewritten in place)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    return path, (scene, frame, st.st_size, st.st_mtime_ns)
+
+# Parses and LOD-orders PCDs in worker processes; concurrent loads of a frame are merged
+point_loader = PointLoader(PCD_WORKERS, observe=lambda stage, seconds: observe_stage("points", stage, seconds))
+
+def warm_up():
+    """
+    Work every worker would otherwise do on its first requests: find the
+    scenes, load the default scene's manifest, index the image and feature
+    caches and import OpenCV. Each step is also done lazily where it is
+    needed, so a request arriving meanwhile only waits for its own part.
+    """
+    t0 = time.perf_counter()
+    scenes = get_scenes()
+    if scenes:
+        log.info("Found %d scenes, default: %s", len(scenes), scenes[-1])
+        manifests.get(scenes[-1])
+    else:
+        log.warning("No valid scenes found in %s/ directory!", DATA_ROOT)
+    image_cache.scan()
+    feature_cache.files.scan()
+    # Otherwise the first image request pays for the import
+    import cv2
+    log.info("Warm-up done in %.2f s", time.perf_counter() - t0)
+
+def start_up():
+    # Fork the PCD workers before any other thread runs, then warm up alongside the first requests
+    point_loader.start()
+    if WARM_UP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def load_columnar(scene, frame):
+    """
+    The frame from its preprocessed .pts file (see preprocess.py), memory-mapped
+    and already LOD-ordered; None if there is none for the PCD as it is now.
+    """
+    path = columnar_path(DATA_ROOT, scene, frame)
+    t0 = time.perf_counter()
+    try:
+        header = read_pts_header(path)
+        st = os.stat(manifests.get(scene).file_path(LIDAR_DIR, frame))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring %s: %s", path, e)
+        return None
+    if not is_current(header, st.st_size, st.st_mtime_ns):
+        return None
+    lod = load_pts(path, header)
+    observe_stage("points", "columnar_load", time.perf_counter() - t0)
+    return lod
+
+def load_frame_points(scene, frame):
+    """
+    Load a frame through the point cache as a lod.PointLOD
+    (full resolution, reordered so any prefix is a voxel-uniform subsample).
+    Returns None if the frame has no PCD file.
+    """
+    pcd_path, cache_key = _pcd_cache_key(scene, frame)
+    if cache_key is None:
+        return None
+
+    lod = pcd_cache.get(cache_key)
+    if lod is None:
+        lod = load_columnar(scene, frame)
+        if lod is None:
+            lod = point_loader.load(cache_key, pcd_path)
+        lod = pcd_cache.put(cache_key, lod)
+    return lod
+
+async def load_frame_points_async(scene, frame):
+    # Same as load_frame_points, without holding a thread while the worker parses
+    pcd_path, cache_key = _pcd_cache_key(scene, frame)
+    if cache_key is None:
+        return None
+
+    lod = pcd_cache.get(cache_key)
+    if lod is None:
+        lod = await run_in_threadpool(load_columnar, scene, frame)
+        if lod is None:
+            lod = await asyncio.wrap_future(point_loader.submit(cache_key, pcd_path))
+        lod = pcd_cache.put(cache_key, lod)
+    return lod
+
+def is_frame_cached(scene, frame):
+    _, cache_key = _pcd_cache_key(scene, frame)
+    return cache_key is not None and cache_key in pcd_cache
+
+# Read-ahead threads only wait on the loader, so match its parallelism
+prefetcher = Prefetcher(load_frame_points, workers=max(1, PCD_WORKERS))
+
+# Per-camera projections keyed by (scene, frame, PCD size, mtime, count, config path, port, camera version)
+projection_cache = PointCache(PROJECTION_CACHE_MB * 1024 * 1024)
+
+# (config path, port) -> (camera version, precompiled camera model, visible sectors)
+_camera_models = {}
+
+def get_camera_model(store, port, camera, version):
+    """
+    (camera model, mask of the azimuth sectors it sees) for one camera of a config.
+    """
+    cached = _camera_models.get((store.path, port))
+    if cached is None or cached[0] != version:
+        # Only a camera's current version matters; replaces the older model
+        model = camera_from_config(camera)
+        cached = _camera_models[(store.path, port)] = (version, model, camera_sectors(model))
+    return cached[1], cached[2]
+
+def frame_sector_index(scene, frame, lod):
+    # Built once per frame, next to the projections that use it
+    _, pcd_key = _pcd_cache_key(scene, frame)
+    key = pcd_key + ("sectors",)
+    index = projection_cache.get(key)
+    if index is None:
+        with timed("projection", "sector_index"):
+            index = projection_cache.put(key, SectorIndex(lod.points))
+    return index
+
+def _set_cookie(response, key, value):
+    response.set_cookie(key, value, httponly=True, samesite="lax")
 
 @app.get("/api/scenes")
-def get_scenes_api():
+def get_scenes_api(request: Request, response: Response):
+    if not request.cookies.get(SESSION_COOKIE):
+        _set_cookie(response, SESSION_COOKIE, secrets.token_hex(16))
+    scenes = get_scenes()
     return {
-        "scenes": get_scenes(),
-        "current": CURRENT_SCENE
+        "scenes": scenes,
+        "current": request_scene(request) if scenes else ""
     }
 
 @app.post("/api/scene")
-def set_scene(payload: Dict = Body(...)):
-    global CURRENT_SCENE, DATA_DIR, pcd_cache
+def set_scene(request: Request, response: Response, payload: Dict = Body(...)):
     scene = payload.get("scene")
-    print(f"Request to switch to scene: {scene}")
-    
     if not scene or scene not in get_scenes():
         raise HTTPException(status_code=400, detail="Invalid scene")
     
-    CURRENT_SCENE = scene
-    DATA_DIR = os.path.join(DATA_ROOT, CURRENT_SCENE, "paired")
-    pcd_cache = {} # Clear cache on scene switch
-    print(f"SUCCESS: Switched to scene: {CURRENT_SCENE}")
-    print(f"NEW DATA_DIR: {DATA_DIR}")
-    return {"status": "ok", "current": CURRENT_SCENE}
+    # Per client: only this session's cookie and read-ahead change
+    _set_cookie(response, SCENE_COOKIE, scene)
+    prefetcher.cancel(session_id(request))
+    log.info("Session switched to scene %s", scene)
+    return {"status": "ok", "current": scene}
 
 @app.get("/api/frames")
-def get_frames():
-    print(f"get_frames called. Current DATA_DIR: {DATA_DIR}")
+def get_frames(request: Request, scene: Optional[str] = None):
+    scene = request_scene(request, scene)
     # List all frames based on port_1 images
-    port1_dir = os.path.join(DATA_DIR, "port_1")
-    if not os.path.exists(port1_dir):
-        print(f"ERROR: port_1 dir not found at {port1_dir}")
+    with timed("frames", "manifest"):
+        frames = list_frames(scene)
+    if not frames:
+        log.warning("No port_1 frames found in %s", scene_data_dir(scene))
         return []
-    files = glob.glob(os.path.join(port1_dir, "*.jpg"))
-    
-    # Sort numerically
-    def get_frame_number(filepath):
-        try:
-            filename = os.path.basename(filepath)
-            name_no_ext = os.path.splitext(filename)[0]
-            return int(name_no_ext)
-        except ValueError:
-            return -1 
-
-    files.sort(key=get_frame_number)
-    
-    frames = [os.path.basename(f).replace(".jpg", "") for f in files]
-    print(f"Found {len(frames)} frames")
+    log_request("frames", scene=scene, frames=len(frames))
     return frames
 
 @app.get("/api/image/{port}/{frame}")
-def get_image(port: str, frame: str):
-    # Serve image file
-    img_path = os.path.join(DATA_DIR, port, f"{frame}.jpg")
-    if not os.path.exists(img_path):
+def get_image(port: str, frame: str, request: Request, scene: Optional[str] = None,
+              size: Optional[int] = None, quality: Optional[int] = None):
+    """
+    Camera image. `size` asks for a downscaled variant of that width (rounded
+    up to a pyramid level) at JPEG `quality`; otherwise the original is served.
+    """
+    scene = request_scene(request, scene)
+    manifest = manifests.get(scene)
+    if manifest is None or not port.startswith("port_") or not manifest.has(port, frame):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size is not None and size < 1:
+        raise HTTPException(status_code=400, detail="size must be positive")
+
+    try:
+        img_path, src_size, src_mtime = image_source(manifest, port, frame)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(img_path)
+    width = snap_size(size, image_width(img_path, src_size, src_mtime))
+    q = clamp_quality(quality) if width else None
+    etag = image_etag(src_size, src_mtime, width, q)
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+
+    # Revalidation while scrubbing back and forth
+    if etag_matches(request, etag):
+        log_request("image", scene=scene, port=port, frame=frame, width=width, status=304)
+        return Response(status_code=304, headers=headers)
+
+    try:
+        # Cache hit, or resizing on a miss
+        with timed("image", "variant" if width else "original"):
+            path = image_file(scene, img_path, port, frame, width, q, etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resize image: {str(e)}")
+    size_bytes = os.path.getsize(path) if width else src_size
+    observe_bytes("image", "variant" if width else "original", size_bytes)
+    log_request("image", scene=scene, port=port, frame=frame, width=width, bytes=size_bytes)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+def image_source(manifest, port, frame):
+    """
+    (path, size, mtime_ns) of a camera image, from the file itself: the
+    manifest only notices a file rewritten in place once its directory changes.
+    """
+    path = manifest.file_path(port, frame)
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+def image_width(path, size, mtime):
+    # From the JPEG header (cached per file version); the rig's default if unreadable
+    dims = jpeg_size(path, size, mtime)
+    return dims[0] if dims else DEFAULT_IMAGE_SIZE[0]
+
+def image_file(scene, img_path, port, frame, width, quality, etag):
+    # Original file, or the cached downscaled variant (rendered on first use)
+    if width is None:
+        return img_path
+    variant = image_cache.variant_path(scene, port, frame, width, quality, etag)
+    return image_cache.get(img_path, variant, width, quality)
 
 @app.get("/api/config")
-def get_config_api():
-    return load_config()
+def get_config_api(request: Request, scene: Optional[str] = None):
+    """
+    The config, with its version as ETag and X-Config-Version. Send the
+    version back as If-Match when saving to detect concurrent edits.
+    """
+    store = config_store_for(request_scene(request, scene))
+    config, version, _ = store.snapshot()
+    etag = config_etag(store, version)
+    headers = {"ETag": etag, "X-Config-Version": str(version), "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(config, headers=headers)
+
+def _conflict_response(e):
+    camera_versions = config_store.snapshot()[2]
+    return JSONResponse({
+        "detail": str(e), "ports": e.ports, "version": config_store.version,
+        "camera_versions": {p: camera_versions.get(p, 0) for p in e.ports},
+    }, status_code=409)
 
 @app.post("/api/config")
-def update_config(config: Dict = Body(...)):
-    save_config(config)
-    return {"status": "ok"}
+def update_config(request: Request, config: Dict = Body(...), scene: Optional[str] = None):
+    # Replaces the whole config; prefer PATCH /api/config/{port}
+    try:
+        version = config_store.replace(config, if_match_version(request), seed=_first_write_seed(
+            request_scene(request, scene)))
+    except ConfigConflict as e:
+        return _conflict_response(e)
+    return JSONResponse({"status": "ok", "version": version}, headers={"ETag": config_etag(config_store, version)})
+
+EXTRINSIC_KEYS = ("x", "y", "z", "roll", "pitch", "yaw")
+
+def check_extrinsic(extrinsic):
+    # Some of EXTRINSIC_KEYS with finite numbers (None: nothing given)
+    if extrinsic is None:
+        return
+    if not isinstance(extrinsic, dict) or set(extrinsic) - set(EXTRINSIC_KEYS):
+        raise HTTPException(status_code=400, detail=f"extrinsic keys must be among {', '.join(EXTRINSIC_KEYS)}")
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and np.isfinite(v)
+               for v in extrinsic.values()):
+        raise HTTPException(status_code=400, detail="extrinsic values must be finite numbers")
+
+@app.patch("/api/config/{port}")
+def patch_camera_config(port: str, request: Request, patch: Dict = Body(...), scene: Optional[str] = None):
+    """
+    Update one camera with a JSON merge patch, e.g. {"extrinsic": {"yaw": 1.5}}.
+    With If-Match, fails with 409 if that camera changed since the given
+    version; changes to other cameras do not conflict.
+    """
+    check_extrinsic(patch.get("extrinsic"))
+    try:
+        camera, version = config_store.patch_camera(port, patch, if_match_version(request),
+                                                    seed=_first_write_seed(request_scene(request, scene)))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown camera")
+    except ConfigConflict as e:
+        return _conflict_response(e)
+    log.info("Config version %d: %s updated", version, port)
+    return JSONResponse({"status": "ok", "version": version, "camera": camera},
+                        headers={"ETag": config_etag(config_store, version)})
+
+@app.get("/api/config/history")
+def get_config_history(since: int = 0, limit: int = 100):
+    """
+    Changes to the global config after version `since`, oldest first:
+    [{version, time, source, ports, changes: {dotted key: [old, new]}}].
+    """
+    return [{k: v for k, v in entry.items() if k != "hash"} for entry in config_store.history(since, limit)]
+
+def schedule_prefetch(owner, scene, frame, count, direction):
+    manifest = manifests.get(scene)
+    if manifest is None or count <= 0:
+        return
+    frames = manifest.frames_with("port_1")
+    idx = manifest.position("port_1", frame)
+    if idx is None:
+        return
+    # Wrap around like the frontend playback loop
+    upcoming = [frames[(idx + direction * k) % len(frames)] for k in range(1, min(count, len(frames) - 1) + 1)]
+    prefetcher.schedule(owner, scene, upcoming, is_cached=is_frame_cached)
+
+def _lod_end(lod, count, voxel, level):
+    # Resolve the requested detail to a prefix length of the LOD ordering
+    if level is not None:
+        levels = lod.levels
+        return levels[min(max(level, 0), len(levels) - 1)]
+    if voxel is not None:
+        return lod.prefix_for_voxel(voxel)
+    return min(MAX_POINTS if count is None else count, len(lod))
+
+async def require_frame_points(scene, frame):
+    # load_frame_points_async for a request: HTTPException if the PCD is missing or unreadable
+    try:
+        lod = await load_frame_points_async(scene, frame)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load PCD: {str(e)}")
+    if lod is None:
+        raise HTTPException(status_code=404, detail="PCD not found")
+    return lod
+
+async def load_playback_points(owner, scene, frame, prefetch, direction):
+    """
+    Load a frame's PointLOD for playback and queue the following frames.
+    An in-flight read-ahead of the same frame is joined, not repeated.
+    Raises HTTPException on failure.
+    """
+    # Queue the next frames; anything queued outside this window (a seek) is cancelled
+    schedule_prefetch(owner, scene, frame, PREFETCH_FRAMES if prefetch is None else prefetch, direction)
+
+    return await require_frame_points(scene, frame)
+
+def check_point_params(direction, count, voxel, start):
+    if direction not in (1, -1):
+        raise HTTPException(status_code=400, detail="direction must be 1 or -1")
+    if (count is not None and count < 1) or (voxel is not None and voxel <= 0) or start < 0:
+        raise HTTPException(status_code=400, detail="count and voxel must be positive, start non-negative")
 
 @app.get("/api/points/{frame}")
-def get_points(frame: str):
-    # Load PCD
-    pcd_path = os.path.join(DATA_DIR, "lidar_os2_pcd", f"{frame}.pcd")
-    if not os.path.exists(pcd_path):
+async def get_points(frame: str, request: Request, scene: Optional[str] = None, format: Optional[str] = None,
+               prefetch: Optional[int] = None, direction: int = 1,
+               count: Optional[int] = None, voxel: Optional[float] = None,
+               level: Optional[int] = None, start: int = 0, port: Optional[str] = None):
+    """
+    Points of a frame in level-of-detail order.
+
+    Detail is chosen by `level` (index into the advertised levels), `voxel`
+    (at least one point per voxel of that size, metres) or `count` (default
+    MAX_POINTS). `start` skips the points the client already has, so a coarse
+    level can be refined progressively by asking for [start, end).
+    With `port`, only the points of [start, end) in the azimuth sectors that
+    camera sees under the saved config are sent (still in LOD order).
+    """
+    try:
+        fmt = negotiate_format(format, request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    check_point_params(direction, count, voxel, start)
+
+    scene = request_scene(request, scene)
+    t0 = time.perf_counter()
+    # Cache lookup, or waiting for the loader (its stages are recorded separately)
+    with timed("points", "load"):
+        lod = await load_playback_points(session_id(request), scene, frame, prefetch, direction)
+    end = _lod_end(lod, count, voxel, level)
+    start = min(start, end)
+    lod_info = {
+        "X-Point-Start": str(start),
+        "X-Point-End": str(end),
+        "X-Point-Total": str(len(lod)),
+        "X-LOD-Levels": ",".join(str(c) for c in lod.levels),
+    }
+    if port is None:
+        points_3d = lod.points[start:end]
+    else:
+        store = config_store_for(scene)
+        config, _, camera_versions = store.snapshot()
+        camera = config.get("cameras", {}).get(port)
+        if camera is None:
+            raise HTTPException(status_code=404, detail="Unknown camera")
+        with timed("points", "frustum"):
+            _, sectors = get_camera_model(store, port, camera, camera_versions.get(port, 0))
+            points_3d = lod.points[frame_sector_index(scene, frame, lod).select(sectors, end, start)]
+        lod_info["X-Point-Camera"] = port
+
+    if fmt == "json":
+        # tolist() and rendering a full frame take a while; keep them off the event loop
+        def render_json():
+            return JSONResponse({
+                "points": points_3d.tolist(),
+                "start": start,
+                "end": end,
+                "total": len(lod),
+                "levels": lod.levels,
+            }, headers=lod_info)
+        with timed("points", "encode"):
+            response = await run_in_threadpool(render_json)
+        size_bytes = len(response.body)
+    else:
+        # Binary transport: header + raw buffer, streamed without building Python lists
+        with timed("points", "encode"):
+            header, payload = encode_points(points_3d, fmt)
+        size_bytes = len(header) + payload.nbytes
+        response = StreamingResponse(
+            iter([header, payload]),
+            media_type=MEDIA_TYPES[fmt],
+            headers={"Content-Length": str(size_bytes), **lod_info}
+        )
+
+    observe_bytes("points", fmt, size_bytes)
+    log_request("points", scene=scene, frame=frame, format=fmt, points=len(points_3d), bytes=size_bytes,
+                ms=round((time.perf_counter() - t0) * 1000, 2))
+    return response
+
+def project_frame(scene, frame, lod, count):
+    """
+    Projections of the first `count` LOD points into every camera of the saved
+    config, cached per camera, so saving one camera only reprojects that
+    camera. Each camera only projects the points of the azimuth sectors it
+    can see (see frustum_index). Returns (config version, [(port, projection)]).
+    """
+    store = config_store_for(scene)
+    config, version, camera_versions = store.snapshot()
+    cameras = config.get("cameras", {})
+    _, pcd_key = _pcd_cache_key(scene, frame)
+    keys = {p: pcd_key + (count, store.path, p, camera_versions.get(p, 0)) for p in cameras}
+
+    projections = {p: projection_cache.get(keys[p]) for p in cameras}
+    missing = [p for p, proj in projections.items() if proj is None]
+    if missing:
+        index = frame_sector_index(scene, frame, lod)
+        models = []
+        candidates = []
+        for port in missing:
+            model, sectors = get_camera_model(store, port, cameras[port], camera_versions.get(port, 0))
+            models.append(model)
+            candidates.append(index.select(sectors, count))
+        # All missing cameras in one batched projection, each over its own candidates;
+        # indices come back as indices into the LOD prefix
+        for port, result in zip(missing, project_points_multi(lod.points, models, subsets=candidates)):
+            projections[port] = projection_cache.put(keys[port], result)
+    return version, list(projections.items())
+
+@app.get("/api/projection/{frame}")
+async def get_projection(frame: str, request: Request, scene: Optional[str] = None,
+                         count: Optional[int] = None):
+    if count is not None and count < 1:
+        raise HTTPException(status_code=400, detail="count must be positive")
+    scene = request_scene(request, scene)
+    lod = await require_frame_points(scene, frame)
+    # Same prefix as /api/points with the same count, so indices line up
+    points_3d = lod.select(count=MAX_POINTS if count is None else count)
+    version, projections = await run_in_threadpool(project_frame, scene, frame, lod, len(points_3d))
+
+    # Indices refer to the same LOD prefix served by /api/points
+    buffers = encode_projection(
+        {"frame": frame, "config_version": version, "points": len(points_3d)},
+        projections
+    )
+    return StreamingResponse(
+        iter(buffers),
+        media_type=PROJECTION_MEDIA_TYPE,
+        headers={"Content-Length": str(sum(len(b) if isinstance(b, bytes) else b.nbytes for b in buffers))}
+    )
+
+DEPTH_MEDIA_TYPES = {"png": "image/png", "npy": "application/octet-stream"}
+
+def render_depth(scene, frame, lod, store, port, camera, camera_version, fmt):
+    model, sectors = get_camera_model(store, port, camera, camera_version)
+    with timed("depth", "project"):
+        candidates = frame_sector_index(scene, frame, lod).select(sectors)
+        uv, depth, valid = model.project(lod.points[candidates])
+    with timed("depth", "zbuffer"):
+        depth_map = sparse_depth(uv[valid], depth[valid], model.width, model.height)
+    with timed("depth", "encode"):
+        return encode_depth(depth_map, fmt)
+
+@app.get("/api/depth/{port}/{frame}")
+async def get_depth(port: str, frame: str, request: Request, scene: Optional[str] = None, format: str = "png"):
+    """
+    Sparse depth map of one camera under the saved config, as depth_export.py
+    writes it: nearest point per pixel, 0 where none, as a 16-bit PNG of
+    metres * DEPTH_SCALE or a float32 .npy.
+    """
+    if format not in DEPTH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(DEPTH_FORMATS)}")
+    scene = request_scene(request, scene)
+    store = config_store_for(scene)
+    config, version, camera_versions = store.snapshot()
+    camera = config.get("cameras", {}).get(port)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Unknown camera")
+    _, pcd_key = _pcd_cache_key(scene, frame)
+    if pcd_key is None:
         raise HTTPException(status_code=404, detail="PCD not found")
-    
-    if pcd_path not in pcd_cache:
+
+    # Same PCD, camera and format: same map
+    etag = f'"depth-{content_hash([list(pcd_key), camera, format])}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Config-Version": str(version),
+               "X-Depth-Scale": str(DEPTH_SCALE)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    lod = await require_frame_points(scene, frame)
+    body = await run_in_threadpool(render_depth, scene, frame, lod, store, port, camera,
+                                   camera_versions.get(port, 0), format)
+    log_request("depth", scene=scene, port=port, frame=frame, format=format, bytes=len(body))
+    return Response(body, media_type=DEPTH_MEDIA_TYPES[format], headers=headers)
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+@app.get("/api/bundle/{frame}")
+async def get_bundle(frame: str, request: Request, scene: Optional[str] = None,
+                     format: str = "i16", size: Optional[int] = None,
+               quality: Optional[int] = None, prefetch: Optional[int] = None,
+               direction: int = 1, count: Optional[int] = None,
+               voxel: Optional[float] = None, level: Optional[int] = None, start: int = 0):
+    """
+    Everything needed to draw a frame in one response: the camera images
+    (downscaled with `size`/`quality` as in /api/image) and the binary point
+    buffer (detail parameters as in /api/points), in the length-prefixed
+    container of point_codec.encode_bundle. Parts are read concurrently.
+    Cameras without an image for this frame are listed under `missing`.
+    """
+    if format not in ("f32", "i16"):
+        raise HTTPException(status_code=400, detail="format must be f32 or i16")
+    if size is not None and size < 1:
+        raise HTTPException(status_code=400, detail="size must be positive")
+    check_point_params(direction, count, voxel, start)
+
+    scene = request_scene(request, scene)
+    manifest = manifests.get(scene)
+    if manifest is None or manifest.position("port_1", frame) is None:
+        raise HTTPException(status_code=404, detail="Frame not found")
+
+    ports = [s for s in manifest.sensors if s.startswith("port_")]
+    present = [p for p in ports if manifest.has(p, frame)]
+
+    def read_image(port):
+        # Snapped per camera, against that camera's own image width
+        img_path, src_size, src_mtime = image_source(manifest, port, frame)
+        width = snap_size(size, image_width(img_path, src_size, src_mtime))
+        q = clamp_quality(quality) if width else None
+        etag = image_etag(src_size, src_mtime, width, q)
+        return _read_file(image_file(scene, img_path, port, frame, width, q, etag))
+
+    # Images are read on the bundle pool while the point loader parses the PCD
+    loop = asyncio.get_running_loop()
+    image_futures = [loop.run_in_executor(bundle_pool, read_image, p) for p in present]
+    lod = await load_playback_points(session_id(request), scene, frame, prefetch, direction)
+    try:
+        images = list(zip(present, await asyncio.gather(*image_futures)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read image: {str(e)}")
+
+    end = _lod_end(lod, count, voxel, level)
+    start = min(start, end)
+    header, payload = encode_points(lod.points[start:end], format)
+    parts = [("points", MEDIA_TYPES[format], [header, payload])]
+    parts += [(port, "image/jpeg", [data]) for port, data in images]
+
+    buffers = encode_bundle({
+        "frame": frame,
+        "points": {"start": start, "end": end, "total": len(lod), "levels": lod.levels},
+        "missing": [p for p in ports if p not in present],
+    }, parts)
+    return StreamingResponse(
+        iter(buffers),
+        media_type=BUNDLE_MEDIA_TYPE,
+        headers={"Content-Length": str(sum(memoryview(b).nbytes for b in buffers))}
+    )
+
+@app.websocket("/ws/playback")
+async def playback_stream(websocket: WebSocket, scene: Optional[str] = None, format: str = "i16",
+                          count: Optional[int] = None, size: Optional[int] = None):
+    """
+    Server-paced playback (see playback.PlaybackSession). Each frame is one
+    binary message in the /api/bundle container with a single `points` part;
+    images are referenced by URL in the header (`images`) so the browser
+    fetches them through the HTTP cache.
+    """
+    await websocket.accept()
+    try:
+        scene = request_scene(websocket, scene)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    frames = list_frames(scene)
+    if not frames or format not in ("f32", "i16") or (count is not None and count < 1):
+        await websocket.close(code=1008)
+        return
+    owner = session_id(websocket)
+    image_query = f"?scene={scene}" + (f"&size={size}" if size else "")
+
+    async def render_frame(frame, seq):
+        lod = await load_playback_points(owner, scene, frame, None, 1)
+        end = _lod_end(lod, count, None, None)
+        header, payload = encode_points(lod.points[:end], format)
+        manifest = manifests.get(scene)
+        images = {p: f"/api/image/{p}/{frame}{image_query}"
+                  for p in manifest.sensors if p.startswith("port_") and manifest.has(p, frame)}
+        return encode_bundle({
+            "seq": seq,
+            "frame": frame,
+            "points": {"start": 0, "end": end, "total": len(lod), "levels": lod.levels},
+            "images": images,
+        }, [("points", MEDIA_TYPES[format], [header, payload])])
+
+    await PlaybackSession(websocket, frames, render_frame, DEFAULT_FPS).run()
+
+# LiDAR depth-edge points keyed by (scene, frame, PCD size, mtime)
+edge_point_cache = PointCache(64 * 1024 * 1024)
+
+def frame_edge_points(scene, frame):
+    """
+    Depth-discontinuity points of a frame's scan (see auto_calib), or None
+    if the frame has no PCD file.
+    """
+    pcd_path, cache_key = _pcd_cache_key(scene, frame)
+    if cache_key is None:
+        return None
+    points = edge_point_cache.get(cache_key)
+    if points is None:
+        points = edge_point_cache.put(cache_key, scan_edge_points(pcd_path))
+    return points
+
+def edge_distance_items(scene, ports, frame):
+    # (image path, map path) per port for FeatureCache.get / get_many
+    manifest = manifests.get(scene)
+    items = []
+    for port in ports:
+        img_path, src_size, src_mtime = image_source(manifest, port, frame)
+        items.append((img_path, feature_cache.path(scene, port, frame, image_etag(src_size, src_mtime))))
+    return items
+
+def camera_edge_distance(scene, port, frame):
+    return feature_cache.get(*edge_distance_items(scene, [port], frame)[0])
+
+def score_frame(scene, frame, config):
+    """
+    Per-camera edge alignment of `frame` under `config` (see
+    auto_calib.alignment_score). Cameras without an image, or without LiDAR
+    edges in view, score None.
+    """
+    manifest = manifests.get(scene)
+    if manifest is None or frame not in manifest.index:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    points = frame_edge_points(scene, frame)
+    if points is None:
+        raise HTTPException(status_code=404, detail="PCD not found")
+
+    cameras = config.get("cameras", {})
+    ports = [p for p in cameras if manifest.has(p, frame)]
+    maps = dict(zip(ports, feature_cache.get_many(edge_distance_items(scene, ports, frame))))
+    result = {}
+    for port, camera in cameras.items():
+        score, used = (None, 0)
+        if maps.get(port) is not None:
+            score, used = alignment_score(camera, points, maps[port])
+        result[port] = {"score": score, "points": used}
+    return {"frame": frame, "clip": SCORE_CLIP, "cameras": result}
+
+@app.get("/api/score/{frame}")
+def get_score(frame: str, request: Request, scene: Optional[str] = None):
+    """
+    Alignment score of each camera under the saved config: mean distance in
+    pixels (clipped at `clip`) from projected LiDAR depth edges to image
+    edges. Lower is better; compare across configs on the same frame.
+    """
+    scene = request_scene(request, scene)
+    return score_frame(scene, frame, load_config(scene))
+
+@app.post("/api/score/{frame}")
+def post_score(frame: str, request: Request, config: Dict = Body(...), scene: Optional[str] = None):
+    # Same as GET for an unsaved config (the UI's live slider values)
+    return score_frame(request_scene(request, scene), frame, config)
+
+calibration_jobs = CalibrationJobs(
+    edge_points=lambda key: frame_edge_points(*key),
+    edge_distance=lambda key: camera_edge_distance(*key),
+)
+
+@app.post("/api/calibrate/{port}")
+def start_calibration(port: str, request: Request, payload: Dict = Body(default={})):
+    """
+    Start refining one camera's extrinsic by LiDAR/image edge alignment
+    (see auto_calib). Starts from the saved extrinsic, or from `extrinsic` in
+    the body (e.g. unsaved slider values). `frames` picks the frames to use;
+    by default CALIBRATION_FRAMES frames spread evenly over the scene.
+    The result is not saved; poll /api/calibrate/jobs/{id} and apply it.
+    """
+    scene = request_scene(request, payload.get("scene"))
+    camera = load_config(scene).get("cameras", {}).get(port)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Unknown camera")
+    extrinsic = payload.get("extrinsic")
+    check_extrinsic(extrinsic)
+    if extrinsic:
+        # Merged like a PATCH, so a partial extrinsic keeps the saved values of the rest
+        camera = dict(camera, extrinsic=dict(camera.get("extrinsic", {}), **extrinsic))
+
+    manifest = manifests.get(scene)
+    candidates = [f for f in manifest.frames_with(LIDAR_DIR) if manifest.has(port, f)]
+    frames = payload.get("frames")
+    if frames is not None and not isinstance(frames, list):
+        raise HTTPException(status_code=400, detail="frames must be a list of frame names")
+    if frames:
+        frames = [str(f) for f in frames]
+        missing = [f for f in frames if f not in set(candidates)]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Frames without image and PCD: {', '.join(missing)}")
+    else:
         try:
-            pcd_cache[pcd_path] = load_pcd(pcd_path)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to load PCD: {str(e)}")
-            
-    points_3d = pcd_cache[pcd_path]
-    
-    # Downsample for web performance
-    target_count = 150000
-    if len(points_3d) > target_count:
-        indices = np.linspace(0, len(points_3d)-1, target_count, dtype=int)
-        points_3d = points_3d[indices]
-        
+            count = int(payload.get("count", CALIBRATION_FRAMES))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="count must be a positive integer")
+        if count < 1:
+            raise HTTPException(status_code=400, detail="count must be a positive integer")
+        count = min(count, len(candidates))
+        if count < 1:
+            raise HTTPException(status_code=400, detail="No frames with both image and PCD")
+        frames = [candidates[i] for i in np.linspace(0, len(candidates) - 1, count).round().astype(int)]
+
+    pairs = [((scene, f), (scene, port, f)) for f in frames]
+    job_id = calibration_jobs.start(port, camera, pairs, frames)
+    return JSONResponse(calibration_jobs.get(job_id), status_code=202)
+
+@app.get("/api/calibrate/jobs/{job_id}")
+def get_calibration(job_id: str):
+    job = calibration_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.delete("/api/calibrate/jobs/{job_id}")
+def cancel_calibration(job_id: str):
+    if not calibration_jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return calibration_jobs.get(job_id)
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
     return {
-        "points": points_3d.tolist()
+        "points": pcd_cache.stats(),
+        "projection": projection_cache.stats(),
+        "images": image_cache.stats(),
+        "features": feature_cache.stats(),
+        "loader": {"workers": PCD_WORKERS, "in_flight": point_loader.in_flight()},
     }
 
+@REGISTRY.register_collector
+def cache_metrics():
+    caches = {
+        "points": pcd_cache.stats(),
+        "projection": projection_cache.stats(),
+        "images": image_cache.stats(),
+        "features": feature_cache.files.stats(),
+        "features_memory": feature_cache.memory.stats(),
+    }
+    def samples(key):
+        return [({"cache": name}, stats[key]) for name, stats in caches.items() if key in stats]
+    return [
+        ("calib_cache_entries", "gauge", "Entries held by a cache.", samples("entries")),
+        ("calib_cache_bytes", "gauge", "Bytes held by a cache.", samples("bytes")),
+        ("calib_cache_max_bytes", "gauge", "Byte budget of a cache.", samples("max_bytes")),
+        ("calib_cache_hits_total", "counter", "Cache lookups that hit.", samples("hits")),
+        ("calib_cache_misses_total", "counter", "Cache lookups that missed.", samples("misses")),
+        ("calib_cache_evictions_total", "counter", "Entries evicted to stay within budget.", samples("evictions")),
+        ("calib_pcd_loads_in_flight", "gauge", "PCD loads queued or running.", [({}, point_loader.in_flight())]),
+    ]
+
+@app.get("/api/metrics")
+def get_metrics():
+    """
+    Latency histograms (per route and per stage), payload sizes and cache
+    statistics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
 # Serve static files (frontend)
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
@@ -0,0 +1,228 @@
+"""
+Synthetic scenes in the data/<scene>/paired layout, for benchmarks and
+tests that cannot use the drive data.
+
+A scene is a field of boxes on a ground plane. Each frame the vehicle moves
+forward; the LiDAR is ray-cast into an organized OS2-like scan (ring-major
+rows, NaN for no return, the Ouster field layout) and each of the six
+cameras into a JPEG. The camera rig is written to paired/config.json, which
+the server uses when there is no global config.json, so overlays line up.
+
+Usage:
+    python synthetic_scene.py data/synthetic [--frames 20] [--pcd-format binary]
+                              [--beams 128] [--columns 2048] [--seed 0]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+from camera_models import get_rotation_matrix
+from pcd_loader import save_pcd
+from scene_manifest import LIDAR_DIR
+
+PORTS = ('port_1', 'port_2', 'port_3', 'port_5', 'port_6', 'port_7')
+PCD_FORMATS = ('ascii', 'binary', 'binary_compressed')
+IMAGE_WIDTH, IMAGE_HEIGHT = 1920, 1280
+INTRINSIC = {"fx": 1318.33, "fy": 1318.33, "cx": 960, "cy": 640, "k1": 0, "k2": 0, "p1": 0, "p2": 0, "k3": 0}
+CAMERA_TILT = 3.0
+# Vehicle travel per frame (metres, along LiDAR +x)
+FRAME_STEP = 1.0
+# Images are ray-cast at this fraction of full resolution, then upscaled
+RENDER_SCALE = 0.25
+
+
+def camera_rig():
+    """
+    config.json camera entries for six cameras spaced 60 degrees apart,
+    port_1 facing forward, mounted 0.2 m above the LiDAR and tilted down by
+    CAMERA_TILT degrees (which also keeps the Euler angles off gimbal lock).
+    """
+    cameras = {}
+    tilt = Rotation.from_euler('x', CAMERA_TILT, degrees=True).as_matrix()
+    for i, port in enumerate(PORTS):
+        a = np.radians(60 * i)
+        # Rows: camera x (right), y (down), z (forward) in LiDAR coordinates
+        R = tilt @ np.array([[np.sin(a), -np.cos(a), 0], [0, 0, -1], [np.cos(a), np.sin(a), 0]])
+        t = -R @ np.array([0.0, 0.0, 0.2])
+        yaw, pitch, roll = Rotation.from_matrix(R).as_euler('ZYX', degrees=True)
+        cameras[port] = {
+            "name": f"Synthetic {60 * i} deg",
+            "intrinsic": dict(INTRINSIC),
+            "extrinsic": {"x": float(t[0]), "y": float(t[1]), "z": float(t[2]),
+                          "roll": float(roll), "pitch": float(pitch), "yaw": float(yaw)},
+        }
+    return {"cameras": cameras}
+
+
+def make_boxes(seed, count=40, max_azimuth=180.0, min_range=6.0, max_range=30.0, extent=0.0):
+    """
+    Axis-aligned boxes (lo, hi) scattered around the origin within
+    +-max_azimuth degrees, plus a ground slab and four walls 10 m beyond
+    them (so box outlines are depth edges against something, not sky).
+    `extent` spreads the boxes further along +x for a vehicle driving that far.
+    """
+    rng = np.random.default_rng(seed)
+    boxes = []
+    for _ in range(count):
+        az = np.radians(rng.uniform(-max_azimuth, max_azimuth))
+        r = rng.uniform(min_range, max_range)
+        cx, cy = r * np.cos(az) + rng.uniform(0, extent), r * np.sin(az)
+        sx, sy, sz = rng.uniform(0.5, 2.5), rng.uniform(0.5, 3.0), rng.uniform(0.8, 3.5)
+        boxes.append(((cx - sx, cy - sy, -1.8), (cx + sx, cy + sy, -1.8 + sz)))
+    near, far = max_range + 10, max_range + extent + 10
+    boxes.append(((-near - 1, -near - 1, -2.2), (far + 1, near + 1, -1.8)))   # ground
+    boxes.append(((far, -near, -2.2), (far + 1, near, 12)))
+    boxes.append(((-near - 1, -near, -2.2), (-near, near, 12)))
+    boxes.append(((-near, near, -2.2), (far, near + 1, 12)))
+    boxes.append(((-near, -near - 1, -2.2), (far, -near, 12)))
+    return np.array(boxes, dtype=np.float64)
+
+
+def ray_cast(origin, dirs, boxes):
+    """
+    Distance to the nearest box along each ray (inf if none) and the box index.
+    Slab test per box, one axis at a time on preallocated buffers.
+    """
+    n = len(dirs)
+    best = np.full(n, np.inf)
+    hit = np.full(n, -1)
+    with np.errstate(divide='ignore'):
+        inv = [1.0 / np.ascontiguousarray(dirs[:, k]) for k in range(3)]
+    tmin, tmax, t1, t2, near, far = (np.empty(n) for _ in range(6))
+    # fmin/fmax skip the NaN of 0 * inf (a ray parallel to a face, starting on it)
+    with np.errstate(invalid='ignore'):
+        for i, (lo, hi) in enumerate(boxes):
+            for k in range(3):
+                np.multiply(inv[k], lo[k] - origin[k], out=t1)
+                np.multiply(inv[k], hi[k] - origin[k], out=t2)
+                np.fmin(t1, t2, out=near)
+                np.fmax(t1, t2, out=far)
+                if k == 0:
+                    tmin[:] = near
+                    tmax[:] = far
+                else:
+                    np.fmax(tmin, near, out=tmin)
+                    np.fmin(tmax, far, out=tmax)
+            ok = (tmax >= tmin) & (tmin > 0) & (tmin < best)
+            best[ok] = tmin[ok]
+            hit[ok] = i
+    return best, hit
+
+
+def render_scan(boxes, beams, columns, origin=(0, 0, 0)):
+    """
+    (beams * columns, 3) float32 points seen from `origin`, ring-major; NaN
+    where a beam hits nothing.
+    """
+    az = np.linspace(-np.pi, np.pi, columns, endpoint=False)[None, :]
+    el = np.radians(np.linspace(-22.5, 22.5, beams))[:, None]
+    dirs = np.stack([np.cos(el) * np.cos(az), np.cos(el) * np.sin(az), np.sin(el) + 0 * az], -1).reshape(-1, 3)
+    dist, _ = ray_cast(np.asarray(origin, dtype=np.float64), dirs, boxes)
+    dist[~np.isfinite(dist)] = np.nan
+    return (dirs * dist[:, None]).astype(np.float32)
+
+
+def os2_columns(points, beams, columns, seed=0):
+    """
+    PCD fields of an Ouster OS2 scan (x y z intensity t reflectivity ring ambient range).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(points)
+    r = np.nan_to_num(np.linalg.norm(points, axis=1))
+    return {
+        'x': points[:, 0], 'y': points[:, 1], 'z': points[:, 2],
+        'intensity': rng.random(n).astype(np.float32),
+        't': np.tile(np.arange(columns, dtype=np.uint32) * 48828, beams),
+        'reflectivity': rng.integers(0, 255, n).astype(np.uint16),
+        'ring': np.repeat(np.arange(beams, dtype=np.uint16), columns),
+        'ambient': rng.integers(0, 4096, n).astype(np.uint16),
+        'range': (r * 1000).astype(np.uint32),
+    }
+
+
+def render_image(boxes, extrinsic, intrinsic, seed, width=IMAGE_WIDTH, height=IMAGE_HEIGHT,
+                 origin=(0, 0, 0), scale=1.0):
+    """
+    Grayscale view of the boxes, each in its own grey level so outlines are
+    image edges. `origin` moves the whole rig; `scale` ray-casts at reduced
+    resolution and upscales (much faster, softer edges).
+    """
+    w, h = round(width * scale), round(height * scale)
+    R = get_rotation_matrix(extrinsic['roll'], extrinsic['pitch'], extrinsic['yaw'])
+    t = np.array([extrinsic['x'], extrinsic['y'], extrinsic['z']])
+    u, v = np.meshgrid((np.arange(w) + 0.5) / scale, (np.arange(h) + 0.5) / scale)
+    rays = np.stack([(u - intrinsic['cx']) / intrinsic['fx'], (v - intrinsic['cy']) / intrinsic['fy'], np.ones_like(u)], -1)
+    dirs = rays.reshape(-1, 3) @ R
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    _, hit = ray_cast(-R.T @ t + np.asarray(origin, dtype=np.float64), dirs, boxes)
+    rng = np.random.default_rng(seed)
+    levels = rng.integers(30, 225, len(boxes) + 1)
+    img = levels[hit].reshape(h, w).astype(np.float32)
+    if scale != 1.0:
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_LINEAR)
+    img += rng.normal(0, 3, img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def write_frame(paired_dir, index, boxes, rig, pcd_format, beams, columns, seed):
+    origin = (index * FRAME_STEP, 0.0, 0.0)
+    points = render_scan(boxes, beams, columns, origin)
+    save_pcd(os.path.join(paired_dir, LIDAR_DIR, f"{index}.pcd"),
+             os2_columns(points, beams, columns, seed + index), pcd_format, width=columns)
+    for port, camera in rig["cameras"].items():
+        img = render_image(boxes, camera["extrinsic"], camera["intrinsic"], seed + index,
+                           origin=origin, scale=RENDER_SCALE)
+        cv2.imwrite(os.path.join(paired_dir, port, f"{index}.jpg"), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def generate_scene(scene_dir, frames, pcd_format='binary', beams=128, columns=2048, seed=0, workers=None):
+    """
+    Write a scene to scene_dir/paired (frames named 0..frames-1), rendering
+    frames in a process pool. Returns the paired directory.
+    """
+    if pcd_format not in PCD_FORMATS:
+        raise ValueError(f"Unknown PCD format: {pcd_format}")
+    paired_dir = os.path.join(scene_dir, "paired")
+    for sensor in PORTS + (LIDAR_DIR,):
+        os.makedirs(os.path.join(paired_dir, sensor), exist_ok=True)
+    rig = camera_rig()
+    with open(os.path.join(paired_dir, "config.json"), 'w') as f:
+        json.dump(rig, f, indent=4)
+
+    boxes = make_boxes(seed, extent=frames * FRAME_STEP)
+    args = [(paired_dir, i, boxes, rig, pcd_format, beams, columns, seed) for i in range(frames)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for a in args:
+            write_frame(*a)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(write_frame, *zip(*args)))
+    return paired_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic six-camera + OS2 scene")
+    parser.add_argument("scene_dir", help="e.g. data/synthetic")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--pcd-format", choices=PCD_FORMATS, default="binary")
+    parser.add_argument("--beams", type=int, default=128)
+    parser.add_argument("--columns", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paired_dir = generate_scene(args.scene_dir, args.frames, args.pcd_format, args.beams, args.columns,
+                                args.seed, args.workers)
+    print(f"Wrote {args.frames} frames to {paired_dir} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()